@@ -0,0 +1,21 @@
+import sqlalchemy as sa
+from alembic import op
+
+# Revision identifiers, used by Alembic.
+revision = 'V15'
+down_revision = 'V14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job_watermarks',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('last_end_time', sa.DateTime(), nullable=True),
+        sa.Column('last_session_id', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table('job_watermarks')
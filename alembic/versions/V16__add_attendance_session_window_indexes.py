@@ -0,0 +1,19 @@
+from alembic import op
+
+# Revision identifiers, used by Alembic.
+revision = 'V16'
+down_revision = 'V15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sessions of a course open at a given time
+    op.create_index('ix_attendance_sessions_course_window', 'attendance_sessions',
+                    ['course_id', 'start_time', 'end_time'])
+    # Sessions not yet ended across all courses, used to rebuild the active session index
+    op.create_index('ix_attendance_sessions_window', 'attendance_sessions', ['end_time', 'start_time'])
+
+def downgrade():
+    op.drop_index('ix_attendance_sessions_window', table_name='attendance_sessions')
+    op.drop_index('ix_attendance_sessions_course_window', table_name='attendance_sessions')
@@ -0,0 +1,31 @@
+from alembic import op
+
+# Revision identifiers, used by Alembic.
+revision = 'V18'
+down_revision = 'V17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Other databases search through the in-process n-gram index (app/helpers/user_search.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # GiST serves both the substring (ILIKE '%x%') filter and nearest-first ordering by trigram distance (<->), so
+    # the best matches are read straight from the index
+    op.execute('CREATE INDEX ix_users_username_trgm ON users USING gist (username gist_trgm_ops)')
+    op.execute('CREATE INDEX ix_users_email_trgm ON users USING gist (email gist_trgm_ops)')
+    # Prefix matches (LIKE 'x%') read in order straight from the index; the "C" collation makes both possible
+    op.execute('CREATE INDEX ix_users_username_lower_prefix ON users ((lower(username) COLLATE "C"))')
+    op.execute('CREATE INDEX ix_users_email_lower_prefix ON users ((lower(email) COLLATE "C"))')
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_users_email_lower_prefix')
+    op.execute('DROP INDEX IF EXISTS ix_users_username_lower_prefix')
+    op.execute('DROP INDEX IF EXISTS ix_users_email_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_users_username_trgm')
@@ -0,0 +1,46 @@
+import sqlalchemy as sa
+from alembic import op
+
+# Revision identifiers, used by Alembic.
+revision = 'V19'
+down_revision = 'V18'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns); attendance_sessions(course_id) is already led by ix_attendance_sessions_course_window (V16)
+INDEXES = [
+    # Student dashboard attendance counts
+    ('ix_student_attendances_user_status', 'student_attendances', ['user_id', 'status']),
+    # Student dashboard and per-course progress counts
+    ('ix_user_lesson_progress_user_completed', 'user_lesson_progress', ['user_id', 'is_completed']),
+    # Progress joined from lessons (course stats, lessons with progress)
+    ('ix_user_lesson_progress_lesson_id', 'user_lesson_progress', ['lesson_id']),
+    # A student's attempts at a quiz
+    ('ix_student_quiz_results_quiz_user', 'student_quiz_results', ['quiz_id', 'user_id']),
+    # Quiz result pages and exports, newest first
+    ('ix_student_quiz_results_quiz_submitted', 'student_quiz_results', ['quiz_id', 'submitted_at', 'id']),
+    ('ix_lessons_course_id', 'lessons', ['course_id']),
+    # Course members; the primary key only serves lookups by user
+    ('ix_user_course_course_id', 'user_course', ['course_id']),
+    ('ix_lesson_quizzes_lesson_id', 'lesson_quizzes', ['lesson_id']),
+    ('ix_quiz_questions_quiz_id', 'quiz_questions', ['quiz_id']),
+    # System log pages, newest first
+    ('ix_system_logs_timestamp', 'system_logs', ['timestamp', 'id']),
+]
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def upgrade():
+    # system_logs is not created by an earlier revision, so it is only indexed where it already exists
+    tables = _existing_tables()
+    for name, table, columns in INDEXES:
+        if table in tables:
+            op.create_index(name, table, columns)
+
+def downgrade():
+    tables = _existing_tables()
+    for name, table, _ in reversed(INDEXES):
+        if table in tables:
+            op.drop_index(name, table_name=table)
@@ -1,22 +1,19 @@
+import time
 from datetime import datetime, timedelta
+from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from app.database import SessionLocal
+from app.config import settings
+from app.database import DbSession, get_session, run_db
+from app.helpers.principals import Principal, principal_cache
 from app.models.user import User
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Example secret key
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
@@ -35,7 +32,18 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+# The role is loaded with the user so the principal can be built from a single query
+def get_user_with_role(username: str, db: Session):
+    return db.query(User).options(joinedload(User.role)).filter(User.username == username).first()
+
+# Runs in the request's own session, so the connection it checks out is the one the handler goes on to use
+def load_principal(username: str, db: Session) -> Optional[Principal]:
+    user = get_user_with_role(username, db)
+    return Principal.from_user(user) if user else None
+
+# Served from the principal cache on the hot path; users and roles are only read on a miss. get_session is get_db in
+# sync mode, so FastAPI's per-request dependency cache hands authentication and the handler the same Session.
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_session)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,20 +54,24 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
         user_id = payload.get("user_id")
-        role_id = payload.get("role_id")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    # note with this query: need to join Role if we want to get the role.name
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    cache_key = (user_id, token)
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
+    principal = await run_db(db, load_principal, username)
+    if principal is None:
         raise credentials_exception
 
-    user.role_id = role_id
-    user.id = user_id
-    return user
+    # Never keep a principal beyond the lifetime of its token
+    token_ttl = payload["exp"] - time.time() if "exp" in payload else settings.principal_cache_ttl_seconds
+    principal_cache.set(cache_key, principal, ttl=min(settings.principal_cache_ttl_seconds, token_ttl))
+    return principal
 
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
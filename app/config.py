@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -5,6 +7,72 @@ load_dotenv()
 
 class Settings(BaseSettings):
     database_url: str
+    # "sync" serves every router from the threadpool, "async" serves the hot routers through AsyncSession
+    database_mode: Literal["sync", "async"] = "sync"
+    # Optional explicit URL for the async driver, derived from database_url when not set
+    async_database_url: Optional[str] = None
+
+    # Connection pool, applied per worker process to both the sync and the async engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+
+    # Authenticated principals cached per (user, token); role changes invalidate them in this process
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+
+    # Compiled quiz definitions (questions + answer key) used for grading and quiz reads. Quiz writes invalidate them
+    # in the worker that made the write only; other workers may grade against the old answer key for up to the TTL.
+    quiz_cache_size: int = 1000
+    quiz_cache_ttl_seconds: int = 60
+    # POST /quizzes/import limits: larger bodies are rejected with 413 before they are read in full
+    quiz_import_max_bytes: int = 5 * 1024 * 1024
+    quiz_import_max_quizzes: int = 500
+
+    # Attendance session windows served to the check-in path without reading attendance_sessions
+    session_window_cache_size: int = 10000
+    session_window_cache_ttl_seconds: int = 300
+    # Sessions open within the next N minutes, indexed by course for /attendances/available
+    active_session_horizon_minutes: int = 15
+    active_session_refresh_seconds: int = 30
+
+    # How often the scheduler rebuilds the in-process user search index (used when the database is not PostgreSQL)
+    user_search_refresh_seconds: int = 300
+
+    # Per-student dashboard summaries; the student's own writes invalidate them in this process
+    dashboard_cache_size: int = 10000
+    dashboard_cache_ttl_seconds: int = 60
+
+    # Admin overview counters: snapshot reuse window and how often they are recounted from the tables
+    stats_snapshot_ttl_seconds: int = 5
+    stats_reconcile_minutes: int = 60
+    # How often each process writes its committed counter changes; the overview lags writes by up to this much
+    stats_flush_seconds: int = 5
+
+    # bcrypt process pool: hashing beyond workers + queue size is rejected with 503 and Retry-After
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 64
+    password_hash_retry_after_seconds: int = 2
+
+    # Buffered audit log: rows are bulk-inserted per batch or interval; a full queue blocks, drops or spills to a file.
+    # "block" only waits in threadpool handlers; entries from async handlers spill rather than stall the event loop
+    audit_batch_size: int = 200
+    audit_flush_interval_seconds: float = 1.0
+    audit_queue_size: int = 10000
+    audit_overflow: Literal["block", "drop", "spill"] = "block"
+    audit_spill_path: str = "audit_spill.jsonl"
+
+    # Per-route latency, status and SQL statement metrics on /metrics, with Server-Timing and X-DB-Queries headers
+    metrics_enabled: bool = True
+    metrics_response_headers: bool = True
+    # Bearer token a scraper sends to /metrics; without it only admins can read the endpoint
+    metrics_token: Optional[str] = None
+    # Development/test query guard: reports routes over their @query_budget and statement shapes repeated with
+    # this many different parameter sets (N+1); "warn" prints, "raise" fails the request
+    query_guard: Literal["off", "warn", "raise"] = "off"
+    query_guard_repeat_threshold: int = 5
 
     class Config:
         env_file = ".env"
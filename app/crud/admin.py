@@ -1,8 +1,13 @@
 from fastapi import HTTPException
-from sqlalchemy import Integer, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Float, select, case, cast
+from sqlalchemy.orm import Session, joinedload, contains_eager
 from sqlalchemy.sql import func
 
+from app.helpers import counters
+from app.helpers.counters import bump_counters, read_counters
+from app.helpers.pagination import DEFAULT_PAGE_SIZE, decode_cursor, after_cursor, build_page, paginate
+from app.helpers.principals import invalidate_role, invalidate_user
+from app.helpers.user_search import search_users, user_search_index
 from app.models.course import Course
 from app.models.lesson import Lesson
 from app.models.role import Role
@@ -14,95 +19,128 @@ from app.schemas import course as schema
 from app.schemas.role import RoleBase
 
 
-def get_admin_dashboard_data(db: Session):
-    total_users = db.query(User).count()
-    total_courses = db.query(Course).count()
-    total_lessons = db.query(Lesson).count()
-
-    active_students = (
-        db.query(UserLessonProgress.user_id)
-        .distinct()
-        .count()
-    )
-
-    completion_avg = db.query(func.avg(UserLessonProgress.is_completed.cast(Integer))).scalar() or 0
+def get_admin_dashboard_data(db: Session, fresh: bool = False):
+    snapshot = read_counters(db, fresh=fresh)
+    values = snapshot.values
+    progress_rows = values[counters.PROGRESS_ROWS]
+    completion_avg = values[counters.COMPLETED_PROGRESS] / progress_rows if progress_rows else 0
 
     return {
-        "total_users": total_users,
-        "total_courses": total_courses,
-        "total_lessons": total_lessons,
-        "active_students": active_students,
-        "average_completion_rate": round(completion_avg * 100, 2)
+        "total_users": values[counters.USERS],
+        "total_courses": values[counters.COURSES],
+        "total_lessons": values[counters.LESSONS],
+        "active_students": values[counters.ACTIVE_STUDENTS],
+        "average_completion_rate": round(completion_avg * 100, 2),
+        "snapshot_age_seconds": snapshot.age_seconds(),
+        "reconciled_at": snapshot.reconciled_at,
     }
 
-def get_all_users(db: Session, search: str = None, role_id: int = None):
-    query = db.query(User).join(Role).options()
-
-    if search:
-        like_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                User.username.ilike(like_pattern),
-                User.email.ilike(like_pattern)
-            )
-        )
-
+def get_all_users(
+        db: Session,
+        search: str = None,
+        role_id: int = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None
+):
+    # Search results are ranked by relevance, so they come back as a single page of the best matches
+    if search and search.strip():
+        return {"items": search_users(db, search, role_id=role_id, limit=limit), "next_cursor": None}
+
+    query = db.query(User).join(Role).options(contains_eager(User.role))
     if role_id:
         query = query.filter(User.role_id == role_id)
 
-    return query.all()
-
-def get_all_courses_with_stats(db: Session):
-    courses = db.query(Course).options(joinedload(Course.creator)).all()
-
-    course_data = []
-
-    for course in courses:
-        total_students = (
-            db.query(UserCourse)
-            .filter(UserCourse.course_id == course.id)
-            .count()
-        )
-
-        total_lessons = (
-            db.query(Lesson)
-            .filter(Lesson.course_id == course.id)
-            .count()
-        )
-
-        total_completed = (
-            db.query(UserLessonProgress)
-            .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
-            .filter(
-                Lesson.course_id == course.id,
-                UserLessonProgress.is_completed == True
-            ).count()
+    return paginate(query, [User.id], limit, cursor)
+
+COURSE_STAT_SORTS = ("id", "title", "total_students", "lesson_count", "avg_completion_rate")
+
+# All per-course aggregates come from one grouped statement, so the cost no longer depends on course count
+def get_all_courses_with_stats(
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    sort_by: str = "id",
+    descending: bool = False
+):
+    if sort_by not in COURSE_STAT_SORTS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort courses by '{sort_by}'")
+
+    students = (
+        select(UserCourse.course_id, func.count().label("total_students"))
+        .group_by(UserCourse.course_id)
+        .subquery()
+    )
+    lessons = (
+        select(Lesson.course_id, func.count().label("lesson_count"))
+        .group_by(Lesson.course_id)
+        .subquery()
+    )
+    progress = (
+        select(
+            Lesson.course_id,
+            func.count().label("total_progress"),
+            func.count().filter(UserLessonProgress.is_completed == True).label("total_completed")
         )
+        .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
+        .group_by(Lesson.course_id)
+        .subquery()
+    )
 
-        total_progress = (
-            db.query(UserLessonProgress)
-            .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
-            .filter(Lesson.course_id == course.id).count()
-        )
+    total_progress = func.coalesce(progress.c.total_progress, 0)
+    avg_completion = case(
+        (total_progress > 0, func.coalesce(progress.c.total_completed, 0) * 100.0 / total_progress),
+        else_=0
+    )
 
-        avg_completion = (
-            (total_completed / total_progress) * 100 if total_progress else 0
+    stats = (
+        select(
+            Course.id,
+            Course.title,
+            Course.description,
+            User.id.label("creator_id"),
+            User.username.label("creator_username"),
+            func.coalesce(students.c.total_students, 0).label("total_students"),
+            func.coalesce(lessons.c.lesson_count, 0).label("lesson_count"),
+            cast(avg_completion, Float).label("avg_completion_rate")
         )
+        .outerjoin(User, User.id == Course.creator_id)
+        .outerjoin(students, students.c.course_id == Course.id)
+        .outerjoin(lessons, lessons.c.course_id == Course.id)
+        .outerjoin(progress, progress.c.course_id == Course.id)
+        .subquery("course_stats")
+    )
 
-        course_data.append({
-            "id": course.id,
-            "title": course.title,
-            "description": course.description,
+    sort_column = stats.c[sort_by]
+    query = select(stats)
+    if cursor:
+        cursor_sort, sort_value, last_id = decode_cursor(cursor, 3)
+        if cursor_sort != sort_by:
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+        if sort_by == "id":
+            query = query.where(after_cursor([stats.c.id], [last_id], descending))
+        else:
+            query = query.where(after_cursor([sort_column, stats.c.id], [sort_value, last_id], descending))
+
+    order = [sort_column.desc(), stats.c.id.desc()] if descending else [sort_column, stats.c.id]
+    rows = db.execute(query.order_by(*order).limit(limit + 1)).all()
+
+    page = build_page(rows, limit, lambda row: (sort_by, row._mapping[sort_by], row.id))
+    page["items"] = [
+        {
+            "id": row.id,
+            "title": row.title,
+            "description": row.description,
             "creator": {
-                "id": course.creator.id,
-                "username": course.creator.username
-            },
-            "total_students": total_students,
-            "lesson_count": total_lessons,
-            "avg_completion_rate": round(avg_completion, 2)
-        })
-
-    return course_data
+                "id": row.creator_id,
+                "username": row.creator_username
+            } if row.creator_id is not None else None,
+            "total_students": row.total_students,
+            "lesson_count": row.lesson_count,
+            "avg_completion_rate": round(row.avg_completion_rate, 2)
+        }
+        for row in page["items"]
+    ]
+    return page
 
 def get_course_details(course_id: int, db: Session):
     course = (
@@ -137,12 +175,13 @@ def delete_course(course_id: int, db: Session):
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
+    bump_counters(db, **{counters.COURSES: -1, counters.LESSONS: -len(course.lessons)})
     db.delete(course)
     db.commit()
     return {"message": "Course deleted successfully"}
 
-def get_all_roles(db: Session):
-    return db.query(Role).all()
+def get_all_roles(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    return paginate(db.query(Role), [Role.id], limit, cursor)
 
 def create_role(role_data: RoleBase, db: Session):
     if db.query(Role).filter_by(name=role_data.name).first():
@@ -159,6 +198,7 @@ def update_role(role_id: int, update_data: RoleBase, db: Session):
         raise HTTPException(status_code=404, detail="Role not found")
     role.name = update_data.name
     db.commit()
+    invalidate_role(role_id)
     return role
 
 def delete_role(role_id: int, db: Session):
@@ -167,6 +207,7 @@ def delete_role(role_id: int, db: Session):
         raise HTTPException(status_code=404, detail="Role not found")
     db.delete(role)
     db.commit()
+    invalidate_role(role_id)
     return {"message": "Role deleted"}
 
 def assign_role_to_user(user_id: int, role_id: int, db: Session):
@@ -176,7 +217,10 @@ def assign_role_to_user(user_id: int, role_id: int, db: Session):
         raise HTTPException(status_code=404, detail="User or Role not found")
     user.role_id = role.id
     db.commit()
+    invalidate_user(user_id)
+    user_search_index.add(user)
     return {"message": f"Role '{role.name}' assigned to user '{user.username}'"}
 
-def get_system_logs(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(SystemLog).order_by(SystemLog.timestamp.desc()).offset(skip).limit(limit).all()
\ No newline at end of file
+# Newest first
+def get_system_logs(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    return paginate(db.query(SystemLog), [SystemLog.timestamp, SystemLog.id], limit, cursor, descending=True)
\ No newline at end of file
@@ -1,20 +1,33 @@
-import io
+import time
 from datetime import datetime
-from sqlite3 import IntegrityError
+from typing import Dict
 
-import pandas as pd
 from fastapi import HTTPException
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
-from starlette.responses import StreamingResponse, JSONResponse
-
+from sqlalchemy import Boolean, or_, select, tuple_, literal, literal_column, exists, func, update
+from sqlalchemy.orm import Session, contains_eager
+from starlette.responses import JSONResponse
+
+from app.database import SessionLocal
+from app.helpers.csv_stream import csv_response, iter_csv
+from app.helpers.dashboard_cache import dashboard_cache, invalidate_dashboards
+from app.helpers.pagination import DEFAULT_PAGE_SIZE, build_page, decode_cursor, paginate
+from app.helpers.principals import Principal
+from app.helpers.query_guard import paged_statements
+from app.helpers.session_windows import SessionWindow, active_sessions, get_session_window
+from app.helpers.upsert import dialect_insert
 from app.models.course import Course
+from app.models.job_watermark import JobWatermark
 from app.models.lesson import Lesson
 from app.models.student_attendance import AttendanceSession, StudentAttendance
 from app.models.user import User
+from app.models.user_course import UserCourse
 from app.schemas import attendance as schema
 from app.schemas.attendance import AttendanceBulkUpdate
 
+ABSENCE_JOB_NAME = "mark_absent_for_expired_sessions"
+ABSENCE_CHUNK_SIZE = 500
+BULK_UPDATE_CHUNK_SIZE = 1000
+
 
 # Create new attendance session by teacher
 def create_attendance_session(data: schema.AttendanceSessionCreate, db: Session):
@@ -28,39 +41,43 @@ def create_attendance_session(data: schema.AttendanceSessionCreate, db: Session)
     db.add(session)
     db.commit()
     db.refresh(session)
+    active_sessions.add(SessionWindow.from_session(session))
     return session
 
 # Check in session by student
 def mark_attendance(user_id: int, session_id: int, db: Session):
-    # Optional: Validate session timing
-    session = db.query(AttendanceSession).filter_by(id=session_id).first()
-    if not session:
+    window = get_session_window(db, session_id)
+    if not window:
         raise HTTPException(status_code=404, detail="Attendance session not found")
 
     now = datetime.now()
-    if session.start_time > now or session.end_time < now:
+    if not window.is_open(now):
         raise HTTPException(status_code=400, detail="Session is not currently active")
 
-    # Attempt to insert record
-    try:
-        record = StudentAttendance(
-            user_id=user_id,
-            attendance_session_id=session_id,
-            status="present",
-            check_in_time=datetime.now()
-        )
-        db.add(record)
-        db.commit()
-        db.refresh(record)
-        return record
-
-    except IntegrityError:
-        db.rollback()  # Very important!
+    # Idempotent insert: a duplicate check-in returns no row instead of raising
+    stmt = (
+        dialect_insert(db, StudentAttendance)
+        .values(user_id=user_id, attendance_session_id=session_id, status="present", check_in_time=now)
+        .on_conflict_do_nothing(index_elements=["attendance_session_id", "user_id"])
+        .returning(*StudentAttendance.__table__.c)
+    )
+    record = db.execute(stmt).mappings().first()
+    if record is None:
+        db.rollback()
         raise HTTPException(status_code=400, detail="You have already checked in to this session")
 
+    db.commit()
+    invalidate_dashboards(user_id)
+    return dict(record)
+
 # get all the sessions list by teacher
-def get_sessions_by_teacher(db: Session, current_user: User):
-    sessions = (
+def get_sessions_by_teacher(
+        db: Session,
+        current_user: Principal,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None
+):
+    query = (
         db.query(AttendanceSession)
         .join(Course, AttendanceSession.course_id == Course.id)
         .outerjoin(AttendanceSession.lesson)
@@ -71,83 +88,159 @@ def get_sessions_by_teacher(db: Session, current_user: User):
             )
         )
         .filter(Course.creator_id == current_user.id)
-        .order_by(AttendanceSession.start_time.desc())
-        .all()
+        .options(contains_eager(AttendanceSession.course), contains_eager(AttendanceSession.lesson))
     )
 
-    return sessions
+    # Latest sessions first
+    return paginate(query, [AttendanceSession.start_time, AttendanceSession.id], limit, cursor, descending=True)
 
 # get available sessions for a student
-def get_available_sessions(db: Session, current_user: User):
+def get_available_sessions(
+        db: Session,
+        current_user: Principal,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None
+):
     if current_user.role.name.lower() != "student":
         raise HTTPException(status_code=403, detail="Only students can view this")
 
-    now = datetime.now()
-    enrolled_course_ids = [course.course_id for course in current_user.courses]
+    enrolled_course_ids = [
+        row.course_id for row in db.query(UserCourse.course_id).filter(UserCourse.user_id == current_user.id)
+    ]
 
     if not enrolled_course_ids:
-        return []
+        return {"items": [], "next_cursor": None}
 
-    sessions = (
-        db.query(AttendanceSession)
-        .outerjoin(AttendanceSession.lesson)  # allow lesson_id to be null
-        .filter(AttendanceSession.start_time <= now)
-        .filter(AttendanceSession.end_time >= now)
-        .filter(
-            or_(
-                AttendanceSession.lesson == None,  # no lesson attached
-                Lesson.course_id.in_(enrolled_course_ids)  # has lesson in enrolled course
-            )
-        )
-        .all()
-    )
-
-    return sessions
+    sessions = sorted(active_sessions.active_for_courses(db, enrolled_course_ids, datetime.now()), key=lambda s: s.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        sessions = [s for s in sessions if s.id > last_id]
+    return build_page(sessions[:limit + 1], limit, lambda s: (s.id,))
 
 # get all student's attendances list in a specific course
-def get_attendance_by_course(course_id: int, db: Session):
-    return (
+def get_attendance_by_course(course_id: int, db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    query = (
         db.query(StudentAttendance)
         .join(AttendanceSession)
         .filter(AttendanceSession.course_id == course_id)
-        .all()
     )
+    return paginate(query, [StudentAttendance.id], limit, cursor)
 
 # automatic mark absent for all the expired sessions
-def mark_absent_for_expired_sessions(db: Session):
+# Sessions are walked in (end_time, id) order from the persisted watermark, and each chunk is
+# finalised with a single INSERT ... SELECT so the cost no longer grows with students per session.
+@paged_statements()
+def mark_absent_for_expired_sessions(db: Session, chunk_size: int = ABSENCE_CHUNK_SIZE):
+    started = time.perf_counter()
     now = datetime.now()
 
-    # Step 1: Find all sessions that already ended but not processed
-    sessions = db.query(AttendanceSession).filter(AttendanceSession.end_time < now).all()
-
-    for session in sessions:
-        if not session.lesson:
-            continue  # skip if session is not linked to a lesson
-
-        course = session.lesson.course
-        enrolled_students = course.users  # many-to-many relationship: Course.users
+    watermark = db.get(JobWatermark, ABSENCE_JOB_NAME)
+    if watermark is None:
+        watermark = JobWatermark(name=ABSENCE_JOB_NAME)
+        db.add(watermark)
+
+    sessions_processed = 0
+    inserted = 0
+
+    while True:
+        # Step 1: Next chunk of ended sessions that were not finalised yet
+        query = (
+            select(AttendanceSession.id, AttendanceSession.end_time)
+            .where(AttendanceSession.end_time < now)
+            .order_by(AttendanceSession.end_time, AttendanceSession.id)
+            .limit(chunk_size)
+        )
+        if watermark.last_end_time is not None:
+            query = query.where(
+                tuple_(AttendanceSession.end_time, AttendanceSession.id)
+                > tuple_(watermark.last_end_time, watermark.last_session_id)
+            )
+        chunk = db.execute(query).all()
+        if not chunk:
+            break
+
+        # Step 2: Every enrolled student of the lesson's course without a record is absent
+        already_recorded = (
+            select(StudentAttendance.id)
+            .where(
+                StudentAttendance.attendance_session_id == AttendanceSession.id,
+                StudentAttendance.user_id == UserCourse.user_id,
+            )
+        )
+        absentees = (
+            select(AttendanceSession.id, UserCourse.user_id, literal("absent"))
+            .join(Lesson, Lesson.id == AttendanceSession.lesson_id)  # skip sessions not linked to a lesson
+            .join(UserCourse, UserCourse.course_id == Lesson.course_id)
+            .where(
+                AttendanceSession.id.in_([row.id for row in chunk]),
+                ~exists(already_recorded),
+            )
+        )
+        stmt = (
+            dialect_insert(db, StudentAttendance)
+            .from_select(["attendance_session_id", "user_id", "status"], absentees)
+            .on_conflict_do_nothing(index_elements=["attendance_session_id", "user_id"])
+        )
+        inserted += db.execute(stmt).rowcount
 
-        for student in enrolled_students:
-            # Step 2: Check if student already has a check-in
-            existing = db.query(StudentAttendance).filter_by(
-                attendance_session_id=session.id, user_id=student.user_id
-            ).first()
+        # Step 3: Advance the watermark in the same transaction as the inserted rows
+        watermark.last_end_time = chunk[-1].end_time
+        watermark.last_session_id = chunk[-1].id
+        watermark.updated_at = now
+        db.commit()
 
-            if not existing:
-                # Step 3: Mark absent
-                new_absence = StudentAttendance(
-                    attendance_session_id=session.id,
-                    user_id=student.id,
-                    status="absent",
-                    check_in_time=None,
-                )
-                db.add(new_absence)
+        sessions_processed += len(chunk)
+        if len(chunk) < chunk_size:
+            break
 
     db.commit()
-    return {"message": "Absent students marked for expired sessions."}
+    if inserted:
+        # The inserted rows are not returned per student, so every cached summary is dropped
+        dashboard_cache.clear()
+    return {
+        "message": "Absent students marked for expired sessions.",
+        "sessions_processed": sessions_processed,
+        "inserted": inserted,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+# Upsert one chunk of (student -> status) records and return how many were inserted, as reported by the write
+# itself. PostgreSQL marks a row the upsert inserted with xmax = 0. Elsewhere the insert skips existing rows and
+# returns the new ones, and the rest are updated: SQLite admits one writer at a time, so no row can appear in between.
+def _upsert_attendance_chunk(db: Session, session_id: int, statuses: Dict[int, str], now: datetime) -> int:
+    stmt = dialect_insert(db, StudentAttendance).values([
+        {
+            "attendance_session_id": session_id,
+            "user_id": user_id,
+            "status": status,
+            "check_in_time": None,
+            "updated_at": now,
+        }
+        for user_id, status in statuses.items()
+    ])
+
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["attendance_session_id", "user_id"],
+            set_={"status": stmt.excluded.status, "updated_at": stmt.excluded.updated_at}
+        ).returning(literal_column("xmax = 0", Boolean))
+        return sum(db.execute(stmt).scalars())
+
+    stmt = stmt.on_conflict_do_nothing(index_elements=["attendance_session_id", "user_id"]).returning(StudentAttendance.user_id)
+    new_ids = set(db.execute(stmt).scalars())
+    for status in ("present", "absent"):
+        existing = [user_id for user_id, value in statuses.items() if value == status and user_id not in new_ids]
+        if existing:
+            db.execute(
+                update(StudentAttendance)
+                .where(StudentAttendance.attendance_session_id == session_id, StudentAttendance.user_id.in_(existing))
+                .values(status=status, updated_at=now)
+            )
+    return len(new_ids)
 
 # bulk update the existing attendances for teacher
-def bulk_update_attendance(data: AttendanceBulkUpdate, teacher: User, db: Session):
+@paged_statements()
+def bulk_update_attendance(data: AttendanceBulkUpdate, teacher: Principal, db: Session):
     # 1.  Validate session exists and teacher owns the course
     session = db.query(AttendanceSession).filter_by(id=data.session_id).first()
     if not session:
@@ -157,34 +250,74 @@ def bulk_update_attendance(data: AttendanceBulkUpdate, teacher: User, db: Sessio
     if course.creator_id != teacher.id and teacher.role.name.lower() != "admin":
         raise HTTPException(403, "Not authorized to edit this session")
 
-    # 2.  Loop through each patch request
-    for patch in data.updates:
-        record = (
-            db.query(StudentAttendance)
-            .filter_by(session_id=data.session_id, user_id=patch.user_id)
-            .first()
-        )
-        if record:
-            record.status = "present" if patch.present else "absent"
-            record.updated_at = datetime.now()
-        else:
-            # Create if missing
-            new_rec = StudentAttendance(
-                session_id=data.session_id,
-                user_id=patch.user_id,
-                status="present" if patch.present else "absent",
-                check_in_time=None,
-                updated_at=datetime.now()
-            )
-            db.add(new_rec)
+    # 2.  Last patch per student wins; every student must exist, then each chunk is upserted
+    statuses = {patch.user_id: "present" if patch.present else "absent" for patch in data.updates}
+    user_ids = list(statuses)
+    now = datetime.now()
+    inserted = updated = 0
+
+    for i in range(0, len(user_ids), BULK_UPDATE_CHUNK_SIZE):
+        chunk = user_ids[i:i + BULK_UPDATE_CHUNK_SIZE]
+        known = set(db.execute(select(User.id).where(User.id.in_(chunk))).scalars())
+        unknown = [user_id for user_id in chunk if user_id not in known]
+        if unknown:
+            raise HTTPException(400, f"Unknown user ids: {', '.join(map(str, unknown))}")
+
+        chunk_inserted = _upsert_attendance_chunk(db, data.session_id, {user_id: statuses[user_id] for user_id in chunk}, now)
+        inserted += chunk_inserted
+        updated += len(chunk) - chunk_inserted
 
     db.commit()
-    return {"message": "Attendance records updated"}
+    invalidate_dashboards(*user_ids)
+    return {"message": "Attendance records updated", "inserted": inserted, "updated": updated}
+
+EXPORT_YIELD_PER = 1000
+
+# Column-only rows streamed with a server-side cursor on a session owned by the generator,
+# since the request-scoped session is closed before the response body is sent
+def _iter_attendance_rows(*criteria, include_session: bool = False):
+    columns = [
+        User.id,
+        User.username,
+        User.email,
+        StudentAttendance.status,
+        StudentAttendance.check_in_time,
+    ]
+    if include_session:
+        columns = [AttendanceSession.id, AttendanceSession.start_time] + columns
+
+    query = (
+        select(*columns)
+        .select_from(StudentAttendance)
+        .join(User, User.id == StudentAttendance.user_id)
+        .join(AttendanceSession, AttendanceSession.id == StudentAttendance.attendance_session_id)
+        .where(*criteria)
+        .order_by(AttendanceSession.start_time, AttendanceSession.id, StudentAttendance.user_id)
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+
+    db = SessionLocal()
+    try:
+        for row in db.execute(query):
+            *leading, check_in_time = row
+            if include_session:
+                leading[1] = leading[1].isoformat() if leading[1] else ""
+            yield (*leading, check_in_time.isoformat() if check_in_time else "")
+    finally:
+        db.close()
+
+def _has_attendance_records(db: Session, *criteria) -> bool:
+    query = (
+        select(StudentAttendance.id)
+        .join(AttendanceSession, AttendanceSession.id == StudentAttendance.attendance_session_id)
+        .where(*criteria)
+    )
+    return db.execute(select(exists(query))).scalar()
 
 def export_attendance_csv(
         session_id: int,
         db: Session,
-        current_user: User
+        current_user: Principal
 ):
     session = db.query(AttendanceSession).filter_by(id=session_id).first()
     if not session:
@@ -193,35 +326,42 @@ def export_attendance_csv(
     if session.course.creator_id != current_user.id and current_user.role.name.lower() != "admin":
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    records = (
-        db.query(StudentAttendance)
-        .filter_by(attendance_session_id=session_id)
-        .join(User)
-        .all()
+    criteria = (StudentAttendance.attendance_session_id == session_id,)
+    if not _has_attendance_records(db, *criteria):
+        return JSONResponse(status_code=404, content={"detail": "No attendance records found."})
+
+    header = ["Student ID", "Name", "Email", "Status", "Check-in Time"]
+    return csv_response(
+        iter_csv(header, _iter_attendance_rows(*criteria)),
+        filename=f"attendance_session_{session_id}.csv"
     )
 
-    if not records:
+# Every session of a course, optionally limited to sessions starting within [start, end]
+def export_course_attendance_csv(
+        course_id: int,
+        db: Session,
+        current_user: Principal,
+        start: datetime = None,
+        end: datetime = None
+):
+    course = db.query(Course).filter_by(id=course_id).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    if course.creator_id != current_user.id and current_user.role.name.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    criteria = [AttendanceSession.course_id == course_id]
+    if start:
+        criteria.append(AttendanceSession.start_time >= start)
+    if end:
+        criteria.append(AttendanceSession.start_time <= end)
+
+    if not _has_attendance_records(db, *criteria):
         return JSONResponse(status_code=404, content={"detail": "No attendance records found."})
 
-    # Prepare dataframe
-    data = [{
-        "Student ID": rec.user.id,
-        "Name": rec.user.username,
-        "Email": rec.user.email,
-        "Status": rec.status,
-        "Check-in Time": rec.check_in_time.isoformat() if rec.check_in_time else ""
-    } for rec in records]
-
-    df = pd.DataFrame(data)
-
-    # Convert to CSV in-memory
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-
-    filename = f"attendance_session_{session_id}.csv"
-    return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    header = ["Session ID", "Session Start", "Student ID", "Name", "Email", "Status", "Check-in Time"]
+    return csv_response(
+        iter_csv(header, _iter_attendance_rows(*criteria, include_session=True)),
+        filename=f"attendance_course_{course_id}.csv"
     )
@@ -1,6 +1,12 @@
 from fastapi import HTTPException
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
+from ..helpers import counters
+from ..helpers.counters import bump_counters
+from ..helpers.dashboard_cache import invalidate_dashboards
+from ..helpers.pagination import DEFAULT_PAGE_SIZE, decode_cursor, after_cursor, build_page, paginate
+from ..helpers.principals import Principal
 from ..models.course import Course
 from ..models.lesson import Lesson
 from ..models.user import User
@@ -13,6 +19,7 @@ from ..schemas.course import CourseWithProgress
 def create_course(db: Session, course: schema.CourseCreate, creator_id: int):
     db_course = Course(**course.dict(), creator_id=creator_id)
     db.add(db_course)
+    bump_counters(db, **{counters.COURSES: 1})
     db.commit()
     db.refresh(db_course)
     return db_course
@@ -52,10 +59,11 @@ def mark_course_complete(course_id: int, current_user_id: int, db: Session):
     # Update status
     enrollment.is_completed = True
     db.commit()
+    invalidate_dashboards(current_user_id)
     return {"message": "Course marked as completed"}
 
-def get_courses(db: Session):
-    return db.query(Course).all()
+def get_courses(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    return paginate(db.query(Course), [Course.id], limit, cursor)
 
 def enroll_user(user_id: int, course_id: int, db: Session):
     # Check if already enrolled
@@ -66,34 +74,68 @@ def enroll_user(user_id: int, course_id: int, db: Session):
     enrollment = UserCourse(user_id=user_id, course_id=course_id)
     db.add(enrollment)
     db.commit()
+    invalidate_dashboards(user_id)
     return {"message": "Enrolled successfully"}
 
-def get_courses_by_user(user_id: int, db: Session):
-    # Corrected query: get actual users
-    courses = db.query(Course).join(UserCourse).filter(UserCourse.user_id == user_id).all()
-    response = []
-
-    for course in courses:
-        lessons = db.query(Lesson).filter_by(course_id=course.id).all()
-        total = len(lessons)
-
-        completed = db.query(UserLessonProgress).filter_by(user_id=user_id, is_completed=True) \
-            .filter(UserLessonProgress.lesson_id.in_([l.id for l in lessons])).count()
-
-        progress = int((completed / total) * 100) if total > 0 else 0
-
-        response.append(CourseWithProgress(
-            id=course.id,
-            title=course.title,
-            description=course.description,
-            creator_id=course.creator_id,
-            is_completed=any(uc.is_completed for uc in course.users if uc.user_id == user_id),
-            progress=progress
-        ))
+# Enrolled courses with lesson totals and the user's completed lessons, aggregated in a single statement
+def get_courses_by_user(user_id: int, db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    enrolled_course_ids = select(UserCourse.course_id).where(UserCourse.user_id == user_id)
 
-    return response
+    lesson_totals = (
+        select(Lesson.course_id, func.count().label("total"))
+        .where(Lesson.course_id.in_(enrolled_course_ids))
+        .group_by(Lesson.course_id)
+        .subquery()
+    )
+    completed_totals = (
+        select(Lesson.course_id, func.count().label("completed"))
+        .join(UserLessonProgress, UserLessonProgress.lesson_id == Lesson.id)
+        .where(UserLessonProgress.user_id == user_id, UserLessonProgress.is_completed == True)
+        .group_by(Lesson.course_id)
+        .subquery()
+    )
 
-def get_users_by_course(course_id: int, db: Session, current_user_id: int):
+    query = (
+        select(
+            Course.id,
+            Course.title,
+            Course.description,
+            Course.creator_id,
+            UserCourse.is_completed,
+            func.coalesce(lesson_totals.c.total, 0).label("total"),
+            func.coalesce(completed_totals.c.completed, 0).label("completed")
+        )
+        .join(UserCourse, and_(UserCourse.course_id == Course.id, UserCourse.user_id == user_id))
+        .outerjoin(lesson_totals, lesson_totals.c.course_id == Course.id)
+        .outerjoin(completed_totals, completed_totals.c.course_id == Course.id)
+    )
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        query = query.where(after_cursor([Course.id], [last_id]))
+
+    rows = db.execute(query.order_by(Course.id).limit(limit + 1)).all()
+
+    page = build_page(rows, limit, lambda row: (row.id,))
+    page["items"] = [
+        CourseWithProgress(
+            id=row.id,
+            title=row.title,
+            description=row.description,
+            creator_id=row.creator_id,
+            is_completed=bool(row.is_completed),
+            progress=int((row.completed / row.total) * 100) if row.total > 0 else 0
+        )
+        for row in page["items"]
+    ]
+    return page
+
+def get_users_by_course(
+        course_id: int,
+        db: Session,
+        current_user_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None
+):
     course = db.query(Course).get(course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -101,10 +143,10 @@ def get_users_by_course(course_id: int, db: Session, current_user_id: int):
         raise HTTPException(status_code=403, detail="Not allowed to view students in this course")
 
     # Corrected query: get actual users
-    users = db.query(User).join(UserCourse).filter(UserCourse.course_id == course.id).all()
-    return users
+    query = db.query(User).join(UserCourse).filter(UserCourse.course_id == course.id)
+    return paginate(query, [User.id], limit, cursor)
 
-def enroll_user_by_teacher(course_id: int, user_id: int, db: Session, current_user: User):
+def enroll_user_by_teacher(course_id: int, user_id: int, db: Session, current_user: Principal):
     course = db.query(Course).filter(Course.id == course_id).first()
     user = db.query(User).filter(User.id == user_id).first()
 
@@ -123,6 +165,7 @@ def enroll_user_by_teacher(course_id: int, user_id: int, db: Session, current_us
     enrollment = UserCourse(user_id=user_id, course_id=course_id)
     db.add(enrollment)
     db.commit()
+    invalidate_dashboards(user_id)
     return {"message": "User enrolled successfully"}
 
 def delete_course(course_id: int, db: Session, creator_id: int):
@@ -133,6 +176,7 @@ def delete_course(course_id: int, db: Session, creator_id: int):
     if course.creator_id != creator_id:
         raise HTTPException(status_code=403, detail="You can only delete your own courses")
 
+    bump_counters(db, **{counters.COURSES: -1, counters.LESSONS: -len(course.lessons)})
     db.delete(course)
     db.commit()
     return {"message": "Course deleted!"}
@@ -1,9 +1,12 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
+from app.helpers import counters
+from app.helpers.counters import bump_counters
+from app.helpers.pagination import DEFAULT_PAGE_SIZE, paginate
+from app.helpers.principals import Principal
 from app.models.course import Course
 from app.models.lesson import Lesson
-from app.models.user import User
 from app.models.user_course import UserCourse
 from app.models.user_lesson_progress import UserLessonProgress
 from app.schemas.lesson import LessonCreate, LessonUpdate
@@ -18,11 +21,18 @@ def create_lesson(course_id: int, lesson: LessonCreate, db: Session, current_use
 
     new_lesson = Lesson(title=lesson.title, content=lesson.content, course_id=course_id)
     db.add(new_lesson)
+    bump_counters(db, **{counters.LESSONS: 1})
     db.commit()
     db.refresh(new_lesson)
     return new_lesson
 
-def get_lessons(course_id: int, db: Session, current_user: User):
+def get_lessons(
+        course_id: int,
+        db: Session,
+        current_user: Principal,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None
+):
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -30,8 +40,7 @@ def get_lessons(course_id: int, db: Session, current_user: User):
     if course.creator_id != current_user.id and current_user.role_id == 1:
         raise HTTPException(status_code=403, detail="You are not allowed to view lessons for this course")
 
-    lessons = db.query(Lesson).filter(Lesson.course_id == course_id).all()
-    return lessons
+    return paginate(db.query(Lesson).filter(Lesson.course_id == course_id), [Lesson.id], limit, cursor)
 
 def update_lesson(lesson_id: int, update: LessonUpdate, db: Session, current_user_id: int):
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
@@ -57,28 +66,39 @@ def delete_lesson(lesson_id: int, db: Session, current_user_id: int):
     if course.creator_id != current_user_id:
         raise HTTPException(status_code=403, detail="You cannot delete this lesson")
 
+    bump_counters(db, **{counters.LESSONS: -1})
     db.delete(lesson)
     db.commit()
     return {"message": "Lesson deleted successfully"}
 
-def get_lessons_with_progress(course_id: int, db: Session, current_user: User):
+def get_lessons_with_progress(
+        course_id: int,
+        db: Session,
+        current_user: Principal,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None
+):
     # Ensure student is enrolled
     enrolled = db.query(UserCourse).filter_by(user_id=current_user.id, course_id=course_id).first()
     if not enrolled:
         raise HTTPException(status_code=403, detail="Not enrolled in this course")
 
-    lessons = db.query(Lesson).filter(Lesson.course_id == course_id).all()
+    page = paginate(db.query(Lesson).filter(Lesson.course_id == course_id), [Lesson.id], limit, cursor)
+    lesson_ids = [lesson.id for lesson in page["items"]]
     progress_map = {
         row.lesson_id: row.is_completed
-        for row in db.query(UserLessonProgress).filter_by(user_id=current_user.id).all()
-    }
+        for row in db.query(UserLessonProgress)
+        .filter_by(user_id=current_user.id)
+        .filter(UserLessonProgress.lesson_id.in_(lesson_ids))
+    } if lesson_ids else {}
 
-    return [
+    page["items"] = [
         {
             "id": lesson.id,
             "title": lesson.title,
             "content": lesson.content,
             "is_completed": progress_map.get(lesson.id, False)
         }
-        for lesson in lessons
+        for lesson in page["items"]
     ]
+    return page
@@ -1,8 +1,20 @@
 from datetime import datetime
+from typing import Iterable, List, Tuple
 
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
+from app.helpers import counters
+from app.helpers.counters import bump_counters
+from app.helpers.csv_stream import csv_response, iter_csv
+from app.helpers.dashboard_cache import invalidate_dashboards
+from app.helpers.pagination import DEFAULT_PAGE_SIZE, after_cursor, build_page, decode_cursor
+from app.helpers.query_guard import paged_statements
+from app.helpers.quiz_cache import get_compiled_quiz, get_compiled_quiz_for_lesson, invalidate_quiz
+from app.models.lesson import Lesson
 from app.models.quiz_models import LessonQuiz, QuizQuestion
 from app.models.quiz_models import StudentQuizResult
 from app.models.user import User
@@ -10,34 +22,87 @@ from app.models.user_lesson_progress import UserLessonProgress
 from app.schemas.quiz import QuizCreate, QuizUpdate
 
 
+# Every problem in a batch of quizzes, labelled by position, so nothing is written unless all are valid
+def _validate_quizzes(quizzes: List[Tuple[str, QuizCreate]], db: Session) -> List[str]:
+    errors = []
+    for label, quiz in quizzes:
+        if not quiz.questions:
+            errors.append(f"{label}Quiz has no questions")
+        for q in quiz.questions:
+            if not q.choices:
+                errors.append(f"{label}Question has no choices: {q.question}")
+            elif q.correct_answer not in q.choices:
+                errors.append(f"{label}Correct answer must be in choices for question: {q.question}")
+
+    lesson_ids = {quiz.lesson_id for _, quiz in quizzes}
+    known = set(db.scalars(select(Lesson.id).where(Lesson.id.in_(lesson_ids)))) if lesson_ids else set()
+    for label, quiz in quizzes:
+        if quiz.lesson_id not in known:
+            errors.append(f"{label}Lesson {quiz.lesson_id} not found")
+    return errors
+
+# One multi-row INSERT for the quizzes and one for all of their questions; the caller commits
+def _insert_quizzes(quizzes: List[QuizCreate], db: Session) -> List[int]:
+    quiz_ids = list(db.scalars(
+        insert(LessonQuiz).returning(LessonQuiz.id, sort_by_parameter_order=True),
+        [{"title": quiz.title, "lesson_id": quiz.lesson_id, "max_attempts": quiz.max_attempts or 1} for quiz in quizzes]
+    ))
+
+    questions = [
+        {"quiz_id": quiz_id, "question": q.question, "choices": q.choices, "correct_answer": q.correct_answer}
+        for quiz_id, quiz in zip(quiz_ids, quizzes)
+        for q in quiz.questions
+    ]
+    if questions:
+        db.execute(insert(QuizQuestion), questions)
+    return quiz_ids
+
 def create_quiz_with_questions(quiz: QuizCreate, db: Session):
-    db_quiz = LessonQuiz(title=quiz.title, lesson_id=quiz.lesson_id, max_attempts=quiz.max_attempts or 1)
-    db.add(db_quiz)
-    db.commit()
-    db.refresh(db_quiz)
-
-    for q in quiz.questions:
-        question = QuizQuestion(
-            quiz_id=db_quiz.id,
-            question=q.question,
-            choices=q.choices,
-            correct_answer=q.correct_answer
-        )
-        if question.correct_answer not in question.choices:
-            raise HTTPException(status_code=400,
-                                detail=f"Correct answer must be in choices for question: {question.question}")
-        db.add(question)
+    errors = _validate_quizzes([("", quiz)], db)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
 
+    (quiz_id,) = _insert_quizzes([quiz], db)
+    db.commit()
+    invalidate_quiz(quiz_id, quiz.lesson_id)
+    return {"message": "Quiz created", "quiz_id": quiz_id}
+
+# Import a question bank given as NDJSON (one QuizCreate object per line) in a single transaction
+def import_quizzes(lines: Iterable[str], db: Session, max_quizzes: int):
+    quizzes, errors = [], []
+    count = 0
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        count += 1
+        if count > max_quizzes:
+            raise HTTPException(status_code=413, detail=f"At most {max_quizzes} quizzes can be imported at once")
+        try:
+            quizzes.append((f"Line {number}: ", QuizCreate.model_validate_json(line)))
+        except ValidationError as e:
+            for err in e.errors():
+                field = ".".join(str(part) for part in err["loc"]) or "quiz"
+                errors.append(f"Line {number}: {field}: {err['msg']}")
+
+    if not quizzes and not errors:
+        raise HTTPException(status_code=400, detail="No quizzes to import")
+
+    errors += _validate_quizzes(quizzes, db)
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    payload = [quiz for _, quiz in quizzes]
+    quiz_ids = _insert_quizzes(payload, db)
     db.commit()
-    return {"message": "Quiz created", "quiz_id": db_quiz.id}
+    for quiz_id, quiz in zip(quiz_ids, payload):
+        invalidate_quiz(quiz_id, quiz.lesson_id)
+    return {"message": "Quizzes imported", "quiz_ids": quiz_ids}
 
 def get_quiz_by_lesson(lesson_id: int, user_id: int, db: Session):
-    quiz = db.query(LessonQuiz).filter_by(lesson_id=lesson_id).first()
+    quiz = get_compiled_quiz_for_lesson(db, lesson_id)
     if not quiz:
         return None
 
-    questions = db.query(QuizQuestion).filter_by(quiz_id=quiz.id).all()
-
     # Get all results by this user for this quiz
     results = db.query(StudentQuizResult).filter_by(
         quiz_id=quiz.id,
@@ -53,19 +118,19 @@ def get_quiz_by_lesson(lesson_id: int, user_id: int, db: Session):
         "submitted_attempts": len(results),
         "score": latest_result.score if latest_result else None,
         "selected_answers": latest_result.selected_answers if latest_result else {},
-        "correct_answers": {q.id: q.correct_answer for q in questions},
+        "correct_answers": dict(quiz.correct_map),
         "questions": [
             {
                 "id": q.id,
                 "question": q.question,
-                "choices": q.choices,
+                "choices": list(q.choices),
                 "correct_answer": q.correct_answer
-            } for q in questions
+            } for q in quiz.questions
         ]
     }
 
 def submit_quiz(submission, user_id: int, db: Session):
-    quiz = db.query(LessonQuiz).filter(LessonQuiz.id == submission.quiz_id).first()
+    quiz = get_compiled_quiz(db, submission.quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
@@ -75,16 +140,15 @@ def submit_quiz(submission, user_id: int, db: Session):
     ).count()
     if attempt_count >= quiz.max_attempts:
         raise HTTPException(status_code=400, detail="Maximum attempts reached for this quiz")
+    if not quiz.questions:
+        raise HTTPException(status_code=400, detail="Quiz has no questions")
 
-    # Load questions and calculate score
-    questions = db.query(QuizQuestion).filter_by(quiz_id=quiz.id).all()
-    correct_map = {q.id: q.correct_answer for q in questions}
-
+    # Grade against the compiled answer key
     correct_count = sum(
         1 for ans in submission.answers
-        if correct_map.get(ans.question_id) == ans.selected
+        if quiz.correct_map.get(ans.question_id) == ans.selected
     )
-    percent_score = round((correct_count / len(questions)) * 100)
+    percent_score = round((correct_count / len(quiz.questions)) * 100)
 
     # Update lesson progress
     lesson_id = quiz.lesson_id
@@ -95,9 +159,14 @@ def submit_quiz(submission, user_id: int, db: Session):
     ).first()
 
     if progress:
+        if bool(progress.is_completed) != passed:
+            bump_counters(db, **{counters.COMPLETED_PROGRESS: 1 if passed else -1})
         progress.is_completed = passed
     else:
+        # active_students is left to the reconcile job: knowing whether this is the student's first progress row
+        # would cost another query on every submission
         db.add(UserLessonProgress(user_id=user_id, lesson_id=lesson_id, is_completed=passed))
+        bump_counters(db, **{counters.PROGRESS_ROWS: 1, counters.COMPLETED_PROGRESS: int(passed)})
 
     # Save quiz result
     result = StudentQuizResult(
@@ -109,15 +178,16 @@ def submit_quiz(submission, user_id: int, db: Session):
     )
     db.add(result)
     db.commit()
+    invalidate_dashboards(user_id)
 
     return {
         "message": "Quiz submitted",
         "score": percent_score,
-        "total": len(questions)
+        "total": len(quiz.questions)
     }
 
 def get_lesson_completion_status(user_id: int, lesson_id: int, db):
-    quiz = db.query(LessonQuiz).filter_by(lesson_id=lesson_id).first()
+    quiz = get_compiled_quiz_for_lesson(db, lesson_id)
     if not quiz:
         return False  # no quiz means cannot be completed
 
@@ -125,7 +195,7 @@ def get_lesson_completion_status(user_id: int, lesson_id: int, db):
     if not result:
         return False
 
-    total_questions = db.query(QuizQuestion).filter_by(quiz_id=quiz.id).count()
+    total_questions = len(quiz.questions)
     return result.score >= 0.6 * total_questions  # 60% threshold
 
 def update_quiz(quiz_id: int, data: QuizUpdate, db: Session):
@@ -144,6 +214,7 @@ def update_quiz(quiz_id: int, data: QuizUpdate, db: Session):
             question.correct_answer = updated.correct_answer
 
     db.commit()
+    invalidate_quiz(quiz_id, quiz.lesson_id)
     return {"message": "Quiz updated successfully"}
 
 def delete_quiz(quiz_id: int, db: Session):
@@ -153,30 +224,103 @@ def delete_quiz(quiz_id: int, db: Session):
     if db.query(StudentQuizResult).filter_by(quiz_id=quiz_id).count() > 0:
         raise HTTPException(status_code=400, detail="Cannot delete a quiz that has submissions.")
 
+    lesson_id = quiz.lesson_id
     db.query(QuizQuestion).filter_by(quiz_id=quiz_id).delete()
     db.delete(quiz)
     db.commit()
+    invalidate_quiz(quiz_id, lesson_id)
     return {"message": "Quiz deleted"}
 
-def get_quiz_results(quiz_id: int, db: Session):
-
-    results = (
-        db.query(StudentQuizResult, User)
-        .join(User, StudentQuizResult.user_id == User.id)
-        .filter(StudentQuizResult.quiz_id == quiz_id)
-        .order_by(StudentQuizResult.submitted_at.desc())
-        .all()
-    )
+EXPORT_PAGE_SIZE = 1000
+
+# Results of a quiz as plain columns; with latest_only, each student's most recent attempt only
+def _quiz_results_select(quiz_id: int, latest_only: bool = False):
+    source = StudentQuizResult.__table__
+    criteria = [source.c.quiz_id == quiz_id]
+
+    if latest_only:
+        attempt_rank = func.row_number().over(
+            partition_by=StudentQuizResult.user_id,
+            order_by=(StudentQuizResult.submitted_at.desc(), StudentQuizResult.id.desc())
+        ).label("attempt_rank")
+        source = (
+            select(StudentQuizResult.__table__, attempt_rank)
+            .where(StudentQuizResult.quiz_id == quiz_id)
+            .subquery()
+        )
+        criteria = [source.c.attempt_rank == 1]
+
+    return (
+        select(
+            source.c.id,
+            source.c.submitted_at,
+            source.c.user_id,
+            User.username,
+            User.email,
+            source.c.score,
+            source.c.selected_answers,
+        )
+        .join(User, User.id == source.c.user_id)
+        .where(*criteria)
+        .order_by(source.c.submitted_at.desc(), source.c.id.desc())
+    ), source
+
+def get_quiz_results(
+        quiz_id: int,
+        db: Session,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str = None,
+        latest_only: bool = False
+):
+    query, source = _quiz_results_select(quiz_id, latest_only)
+    if cursor:
+        query = query.where(
+            after_cursor([source.c.submitted_at, source.c.id], decode_cursor(cursor, 2), descending=True)
+        )
 
-    return [
+    rows = db.execute(query.limit(limit + 1)).all()
+    page = build_page(rows, limit, lambda row: (row.submitted_at, row.id))
+    page["items"] = [
         {
-            "user_id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "score": result.score,
-            "submitted_at": result.submitted_at,
-            "selected_answers": result.selected_answers,
+            "user_id": row.user_id,
+            "username": row.username,
+            "email": row.email,
+            "score": row.score,
+            "submitted_at": row.submitted_at,
+            "selected_answers": row.selected_answers,
         }
-        for result, user in results
+        for row in page["items"]
     ]
+    return page
+
+# Walk the results newest first one keyset page at a time, so neither the database
+# nor this process holds more than a page, and no connection is kept between pages
+def _iter_quiz_result_rows(quiz_id: int, latest_only: bool, page_size: int = EXPORT_PAGE_SIZE):
+    query, source = _quiz_results_select(quiz_id, latest_only)
+    last_key = None
+
+    while True:
+        page = query
+        if last_key:
+            page = page.where(after_cursor([source.c.submitted_at, source.c.id], last_key, descending=True))
+
+        with SessionLocal() as db, paged_statements():
+            rows = db.execute(page.limit(page_size)).all()
 
+        for row in rows:
+            answer_str = "; ".join(f"Q{qid}: {ans}" for qid, ans in (row.selected_answers or {}).items())
+            yield row.username, row.email, row.score, row.submitted_at, answer_str
+
+        if len(rows) < page_size:
+            return
+        last_key = [rows[-1].submitted_at, rows[-1].id]
+
+def export_quiz_results_csv(quiz_id: int, db: Session, latest_only: bool = False):
+    if not db.query(LessonQuiz.id).filter_by(id=quiz_id).first():
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    header = ["Username", "Email", "Score", "Submitted At", "Answers"]
+    return csv_response(
+        iter_csv(header, _iter_quiz_result_rows(quiz_id, latest_only)),
+        filename=f"quiz_{quiz_id}_results.csv"
+    )
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
 
+from ..helpers.pagination import DEFAULT_PAGE_SIZE, paginate
+from ..helpers.principals import invalidate_role
 from ..models.role import Role
 from ..schemas import role as schema
 
@@ -11,8 +13,8 @@ def create_role(db: Session, role: schema.RoleBase):
     db.refresh(db_role)
     return db_role
 
-def get_roles(db: Session):
-    return db.query(Role).all()
+def get_roles(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    return paginate(db.query(Role), [Role.id], limit, cursor)
 
 def get_role(db: Session, role_id: int):
     return db.query(Role).filter(Role.id == role_id).first()
@@ -22,7 +24,8 @@ def delete_role(db: Session, role_id: int):
     if role:
         db.delete(role)
         db.commit()
+        invalidate_role(role_id)
     return role
 
-def search_role(db: Session, name: str):
-    return db.query(Role).filter(Role.name.ilike(f"%{name}%")).all()
+def search_role(db: Session, name: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    return paginate(db.query(Role).filter(Role.name.ilike(f"%{name}%")), [Role.id], limit, cursor)
@@ -1,6 +1,12 @@
 from passlib.context import CryptContext
+from sqlalchemy import func, select, true
 from sqlalchemy.orm import Session
 
+from ..helpers import counters
+from ..helpers.counters import bump_counters
+from ..helpers.dashboard_cache import dashboard_cache
+from ..helpers.pagination import DEFAULT_PAGE_SIZE, paginate
+from ..helpers.user_search import user_search_index
 from ..models import user as model
 from ..models.student_attendance import StudentAttendance
 from ..models.user_course import UserCourse
@@ -12,44 +18,79 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_user(db: Session, user: schema.UserCreate):
+# Routers hash on the password pool and pass the result; the inline hash is kept for scripts
+def create_user(db: Session, user: schema.UserCreate, hashed_password: str = None):
     # db_user = model.User(**user.dict())
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = model.User(username=user.username, password=hashed_password, email=user.email, role_id=user.role_id)
     db.add(db_user)
+    bump_counters(db, **{counters.USERS: 1})
     db.commit()
     db.refresh(db_user)
+    user_search_index.add(db_user)
     return db_user
 
-def get_users(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(model.User).offset(skip).limit(limit).all()
+def get_users(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None):
+    return paginate(db.query(model.User), [model.User.id], limit, cursor)
 
 def get_user(db: Session, user_id: int):
     return db.query(model.User).filter(model.User.id == user_id).first()
 
+def get_user_by_username(db: Session, username: str):
+    return db.query(model.User).filter(model.User.username == username).first()
 
+
+# All six counts in one statement, each table read once; cached per student until one of their writes
 def get_student_dashboard_summary(
     user_id: int,
     db: Session
 ):
-    total_courses = db.query(UserCourse).filter_by(user_id=user_id).count()
-    completed_courses = db.query(UserCourse).filter_by(user_id=user_id, is_completed=True).count()
-
-    total_lessons = db.query(UserLessonProgress).filter_by(user_id=user_id).count()
-    completed_lessons = db.query(UserLessonProgress).filter_by(user_id=user_id, is_completed=True).count()
+    cached = dashboard_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
 
-    total_attendance = db.query(StudentAttendance).filter_by(user_id=user_id).count()
-    present_attendance = db.query(StudentAttendance).filter_by(user_id=user_id, status="present").count()
+    courses = (
+        select(
+            func.count().label("total_courses"),
+            func.count().filter(UserCourse.is_completed == True).label("completed_courses"),
+        )
+        .where(UserCourse.user_id == user_id)
+        .subquery()
+    )
+    lessons = (
+        select(
+            func.count().label("total_lessons"),
+            func.count().filter(UserLessonProgress.is_completed == True).label("completed_lessons"),
+        )
+        .where(UserLessonProgress.user_id == user_id)
+        .subquery()
+    )
+    attendance = (
+        select(
+            func.count().label("total_attendance"),
+            func.count().filter(StudentAttendance.status == "present").label("present_attendance"),
+        )
+        .where(StudentAttendance.user_id == user_id)
+        .subquery()
+    )
+    # Each aggregate yields exactly one row, so the joins only put them side by side
+    counts = db.execute(
+        select(courses, lessons, attendance)
+        .select_from(courses.join(lessons, true()).join(attendance, true()))
+    ).one()
 
     attendance_rate = (
-        round((present_attendance / total_attendance) * 100, 2) if total_attendance else 0.0
+        round((counts.present_attendance / counts.total_attendance) * 100, 2) if counts.total_attendance else 0.0
     )
 
-    return {
-        "total_courses": total_courses,
-        "completed_courses": completed_courses,
-        "total_lessons": total_lessons,
-        "completed_lessons": completed_lessons,
+    summary = {
+        "total_courses": counts.total_courses,
+        "completed_courses": counts.completed_courses,
+        "total_lessons": counts.total_lessons,
+        "completed_lessons": counts.completed_lessons,
         "attendance_rate": attendance_rate,
         "badges": [],  # future integration
     }
+    dashboard_cache.set(user_id, summary)
+    return dict(summary)
@@ -1,9 +1,82 @@
+from typing import Union
+
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, Session
 
 from .config import settings
+from .helpers.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Pool options from settings; in-memory SQLite keeps its single-connection pool
+def get_pool_options(url: str, poolclass) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **get_pool_options(SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async drivers used when DATABASE_MODE=async and no ASYNC_DATABASE_URL is given
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url() -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+
+    url = make_url(SQLALCHEMY_DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}', set ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+ASYNC_MODE = settings.database_mode == "async"
+
+ASYNC_DATABASE_URL = get_async_database_url() if ASYNC_MODE else None
+
+async_engine = (
+    create_async_engine(ASYNC_DATABASE_URL, **get_pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool))
+    if ASYNC_MODE else None
+)
+# expire_on_commit must stay off: expired attributes cannot be lazy-loaded outside the event loop
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if ASYNC_MODE else None
+)
+
+DbSession = Union[Session, AsyncSession]
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Session dependency of the hot routers: AsyncSession in async mode, the threadpool Session otherwise
+get_session = get_async_db if ASYNC_MODE else get_db
+
+# Run a sync CRUD function against either kind of session without blocking the event loop.
+# AsyncSession.run_sync hands the function a regular Session bound to the async connection.
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(*args, db=session, **kwargs))
+    return await run_in_threadpool(fn, *args, db=db, **kwargs)
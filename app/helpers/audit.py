@@ -1,13 +1,155 @@
+import asyncio
+import atexit
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from app.config import settings
+from app.database import SessionLocal
 from app.models.system_log import SystemLog
 
 
-def log_action(db: Session, user_id: int = None, action: str = '', detail: str = ''):
-    log_entry = SystemLog(
-        user_id=user_id,
-        action=action,
-        detail=detail
-    )
-    db.add(log_entry)
-    db.commit()
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+# Buffers audit entries in memory and bulk-inserts them from a background thread,
+# flushing whenever a batch fills up or the flush interval elapses.
+class AuditWriter:
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int, overflow: str, spill_path: str):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # Serialises spill file appends; separate from _lock so stats() never waits on file I/O
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._atexit_registered = False
+        self._written = 0
+        self._dropped = 0
+        self._spilled = 0
+        self._failed_batches = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    # Flush everything still queued and stop the background thread
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def submit(self, entry: dict):
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+        try:
+            self._queue.put_nowait(entry)
+            return
+        except queue.Full:
+            pass
+
+        # "block" only waits in threadpool workers: async handlers call this on the event loop thread, where
+        # waiting would stall every request of the worker, so their entries spill instead
+        if self.overflow == "block" and not _on_event_loop():
+            self._queue.put(entry)
+        elif self.overflow == "drop":
+            with self._lock:
+                self._dropped += 1
+        else:
+            self._spill([entry])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "written": self._written,
+                "dropped": self._dropped,
+                "spilled": self._spilled,
+                "failed_batches": self._failed_batches,
+            }
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self._stop.is_set():
+                return
+
+    def _next_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if self._stop.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        db = SessionLocal()
+        try:
+            db.execute(insert(SystemLog), batch)
+            db.commit()
+            with self._lock:
+                self._written += len(batch)
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Failed to write {len(batch)} audit entries: {e}")
+            with self._lock:
+                self._failed_batches += 1
+            self._spill(batch)
+        finally:
+            db.close()
+
+    # Append entries to a local JSON-lines file so they can be replayed later
+    def _spill(self, entries: list):
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        with self._lock:
+            self._spilled += len(entries)
+
+
+audit_writer = AuditWriter(
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    max_queue=settings.audit_queue_size,
+    overflow=settings.audit_overflow,
+    spill_path=settings.audit_spill_path,
+)
+
+# Queues the entry for the background writer; the caller's session is no longer committed here
+def log_action(db: Session = None, user_id: int = None, action: str = '', detail: str = ''):
+    audit_writer.submit({
+        "user_id": user_id,
+        "action": action,
+        "detail": detail,
+        "timestamp": datetime.now(timezone.utc),
+    })
@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.helpers.upsert import dialect_insert
+from app.models.course import Course
+from app.models.job_watermark import JobWatermark
+from app.models.lesson import Lesson
+from app.models.stat_counter import StatCounter
+from app.models.user import User
+from app.models.user_lesson_progress import UserLessonProgress
+
+USERS = "users"
+COURSES = "courses"
+LESSONS = "lessons"
+ACTIVE_STUDENTS = "active_students"
+PROGRESS_ROWS = "progress_rows"
+COMPLETED_PROGRESS = "completed_progress"
+COUNTER_NAMES = (USERS, COURSES, LESSONS, ACTIVE_STUDENTS, PROGRESS_ROWS, COMPLETED_PROGRESS)
+
+RECONCILE_JOB_NAME = "reconcile_stat_counters"
+# pg_advisory_xact_lock key held by every flush and reconcile of stat_counters
+COUNTERS_LOCK_KEY = 7_301_417
+# Session.info key of the deltas staged by the session's current transaction
+STAGED_DELTAS_KEY = "stat_counter_deltas"
+
+
+# Last values read from stat_counters, reused until stats_snapshot_ttl_seconds have passed
+class CounterSnapshot:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.values: Optional[Dict[str, int]] = None
+        self.reconciled_at: Optional[datetime] = None
+        self.taken_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self.taken_at = 0.0
+
+    def is_fresh(self) -> bool:
+        return self.values is not None and time.monotonic() - self.taken_at < self.ttl
+
+    def store(self, values: Dict[str, int], reconciled_at: Optional[datetime]):
+        with self._lock:
+            self.values = values
+            self.reconciled_at = reconciled_at
+            self.taken_at = time.monotonic()
+
+    def age_seconds(self) -> float:
+        return round(time.monotonic() - self.taken_at, 3)
+
+
+counter_snapshot = CounterSnapshot(ttl=settings.stats_snapshot_ttl_seconds)
+
+
+# Committed deltas of this process not yet written to stat_counters. Writing them per request would make every
+# concurrent writer (a quiz deadline's submissions) queue on the row lock of the same few counter rows.
+# Each transaction's deltas keep their commit time, so a flush can drop those a reconcile has already recounted.
+class PendingDeltas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[datetime, Dict[str, int]]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def add(self, deltas: Dict[str, int], committed_at: Optional[datetime] = None):
+        with self._lock:
+            self._entries.append((committed_at or datetime.now(), dict(deltas)))
+
+    # Totals of the deltas committed after counted_at (all of them without it), and the latest of their commit times
+    def take_since(self, counted_at: Optional[datetime]) -> Tuple[Dict[str, int], Optional[datetime]]:
+        with self._lock:
+            entries, self._entries = self._entries, []
+        totals, latest = {}, None
+        for committed_at, deltas in entries:
+            if counted_at is not None and committed_at <= counted_at:
+                continue
+            latest = max(latest or committed_at, committed_at)
+            for name, delta in deltas.items():
+                totals[name] = totals.get(name, 0) + delta
+        return {name: delta for name, delta in totals.items() if delta}, latest
+
+    def take(self) -> Dict[str, int]:
+        return self.take_since(None)[0]
+
+
+pending_deltas = PendingDeltas()
+
+
+# Stage counter changes on the caller's transaction: they reach pending_deltas when it commits and are dropped
+# when it rolls back; flush_counter_deltas then writes them on a schedule
+def bump_counters(db: Session, **deltas: int):
+    staged = db.info.setdefault(STAGED_DELTAS_KEY, {})
+    for name, delta in deltas.items():
+        if delta:
+            staged[name] = staged.get(name, 0) + delta
+
+@event.listens_for(Session, "after_commit")
+def _publish_staged_deltas(session):
+    staged = session.info.pop(STAGED_DELTAS_KEY, None)
+    if staged:
+        pending_deltas.add(staged)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_deltas(session):
+    session.info.pop(STAGED_DELTAS_KEY, None)
+
+_counters_lock = threading.Lock()
+
+# Flushes and reconciles run one at a time: a threading lock within the process and, on PostgreSQL, an advisory
+# lock held until the caller's transaction ends across worker processes. The block must commit or roll back.
+@contextmanager
+def _exclusive_counter_writes(db: Session):
+    with _counters_lock:
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                db.execute(select(func.pg_advisory_xact_lock(COUNTERS_LOCK_KEY)))
+            yield
+        except Exception:
+            db.rollback()
+            raise
+
+def _recounted_at(db: Session) -> Optional[datetime]:
+    return db.execute(select(JobWatermark.updated_at).where(JobWatermark.name == RECONCILE_JOB_NAME)).scalar()
+
+# One upsert for everything this process committed since the last flush. Deltas committed before the latest
+# reconcile's recount, by this or any other process, are already in its values and are dropped.
+def flush_counter_deltas(db: Session) -> Dict[str, int]:
+    if not pending_deltas:
+        return {}
+
+    with _exclusive_counter_writes(db):
+        deltas, latest = pending_deltas.take_since(_recounted_at(db))
+        if not deltas:
+            db.rollback()
+            return deltas
+        try:
+            _apply_deltas(db, deltas)
+            db.commit()
+        except Exception:
+            pending_deltas.add(deltas, latest)
+            raise
+    counter_snapshot.invalidate()
+    return deltas
+
+def _apply_deltas(db: Session, deltas: Dict[str, int]):
+    now = datetime.now()
+    stmt = dialect_insert(db, StatCounter).values(
+        [{"name": name, "value": delta, "updated_at": now} for name, delta in deltas.items()]
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"value": StatCounter.value + stmt.excluded.value, "updated_at": stmt.excluded.updated_at}
+    ))
+
+def _true_values(db: Session) -> Dict[str, int]:
+    row = db.execute(select(
+        select(func.count()).select_from(User).scalar_subquery().label(USERS),
+        select(func.count()).select_from(Course).scalar_subquery().label(COURSES),
+        select(func.count()).select_from(Lesson).scalar_subquery().label(LESSONS),
+        select(func.count(UserLessonProgress.user_id.distinct())).scalar_subquery().label(ACTIVE_STUDENTS),
+        select(func.count()).select_from(UserLessonProgress).scalar_subquery().label(PROGRESS_ROWS),
+        select(func.coalesce(func.sum(UserLessonProgress.is_completed.cast(Integer)), 0))
+        .scalar_subquery().label(COMPLETED_PROGRESS),
+    )).one()
+    return {name: int(row._mapping[name]) for name in COUNTER_NAMES}
+
+# Recount everything and overwrite the counters; corrects drift from paths that do not bump them
+# (rows removed by cascades, writes outside the API). The watermark records when the recount started: every
+# worker's flush drops the deltas it committed before then, since the recount already includes them.
+def reconcile_counters(db: Session) -> Dict[str, int]:
+    flush_counter_deltas(db)
+
+    with _exclusive_counter_writes(db):
+        counted_at = datetime.now()
+        values = _true_values(db)
+
+        stmt = dialect_insert(db, StatCounter).values(
+            [{"name": name, "value": value, "updated_at": counted_at} for name, value in values.items()]
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at}
+        ))
+
+        watermark = db.get(JobWatermark, RECONCILE_JOB_NAME) or JobWatermark(name=RECONCILE_JOB_NAME)
+        watermark.updated_at = counted_at
+        db.add(watermark)
+        db.commit()
+
+    counter_snapshot.store(values, counted_at)
+    return values
+
+def read_counters(db: Session, fresh: bool = False) -> CounterSnapshot:
+    if fresh:
+        reconcile_counters(db)
+        return counter_snapshot
+    if counter_snapshot.is_fresh():
+        return counter_snapshot
+
+    watermark = db.get(JobWatermark, RECONCILE_JOB_NAME)
+    values = {name: value for name, value in db.execute(select(StatCounter.name, StatCounter.value))}
+    if watermark is None or any(name not in values for name in COUNTER_NAMES):
+        # Never reconciled yet: whatever the table holds are deltas without a base
+        reconcile_counters(db)
+        return counter_snapshot
+
+    counter_snapshot.store(values, watermark.updated_at)
+    return counter_snapshot
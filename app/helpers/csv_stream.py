@@ -0,0 +1,33 @@
+import csv
+import io
+
+from starlette.responses import StreamingResponse
+
+CSV_CHUNK_ROWS = 500
+
+
+# Render rows as encoded CSV chunks; only one chunk is ever held in memory
+def iter_csv(header, rows, chunk_rows: int = CSV_CHUNK_ROWS):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def csv_response(chunks, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,11 @@
+from app.config import settings
+from app.helpers.cache import TTLCache
+
+# User id -> student dashboard summary. Writes to a student's enrollments, progress or attendance drop their
+# entry after commit; the TTL bounds staleness across worker processes and after cascading deletes.
+dashboard_cache = TTLCache(maxsize=settings.dashboard_cache_size, ttl=settings.dashboard_cache_ttl_seconds)
+
+
+def invalidate_dashboards(*user_ids: int):
+    for user_id in user_ids:
+        dashboard_cache.pop(user_id)
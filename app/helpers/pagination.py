@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+# Opaque cursor holding the sort key of the last row of a page
+def encode_cursor(*values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return [_decode_value(v) for v in values]
+
+# Keyset condition selecting the rows that come after the cursor position
+def after_cursor(columns, values, descending: bool = False):
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+# Cut a result fetched with `limit + 1` rows into a page and the cursor of the next one
+def build_page(rows, limit: int, cursor_key):
+    rows = list(rows)
+    if len(rows) <= limit:
+        return {"items": rows, "next_cursor": None}
+
+    items = rows[:limit]
+    return {"items": items, "next_cursor": encode_cursor(*cursor_key(items[-1]))}
+
+# Keyset page over an unordered ORM query; the last column must make the order unique
+def paginate(query, columns, limit: int, cursor: str = None, descending: bool = False):
+    if cursor:
+        query = query.filter(after_cursor(columns, decode_cursor(cursor, len(columns)), descending))
+
+    order = [column.desc() for column in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    return build_page(rows, limit, lambda row: [getattr(row, column.key) for column in columns])
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils import hash_password, verify_password
+
+
+# bcrypt runs in a dedicated, size-limited process pool so login storms cannot starve the request threadpool.
+# Admission is bounded: once workers + queue slots are taken, callers get a fast 503 instead of queueing forever.
+class PasswordHasherPool:
+    def __init__(self, workers: int, queue_size: int, retry_after: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.retry_after = retry_after
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the server process is multi-threaded
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+            return self._executor
+
+    # A worker that dies (killed, out of memory) breaks the whole executor; the next call starts a new one.
+    # Concurrent callers may see the same breakage, so only the executor that broke is dropped.
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _unavailable(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Authentication service is busy, please retry shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    # Retried once on a fresh executor when the pool breaks under the call
+    async def _submit(self, fn, *args):
+        for _ in range(2):
+            executor = self._get_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+        raise self._unavailable()
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise self._unavailable()
+            self._in_flight += 1
+
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            result = await self._submit(fn, *args)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight -= 1
+                if succeeded:
+                    self._completed += 1
+                    self._latency_total += elapsed
+                    self._latency_max = max(self._latency_max, elapsed)
+                else:
+                    self._failed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self.workers, 0),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "latency_seconds_avg": round(self._latency_total / self._completed, 6) if self._completed else 0.0,
+                "latency_seconds_max": round(self._latency_max, 6),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHasherPool(
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size,
+    retry_after=settings.password_hash_retry_after_seconds,
+)
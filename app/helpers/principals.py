@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import settings
+from app.helpers.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class RolePrincipal:
+    id: int
+    name: str
+
+
+# The authenticated caller as seen by the handlers: enough to authorise without touching users/roles
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    role_id: Optional[int]
+    role: Optional[RolePrincipal]
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        role = RolePrincipal(id=user.role.id, name=user.role.name) if user.role else None
+        return cls(id=user.id, username=user.username, role_id=user.role_id, role=role)
+
+
+# Keyed by (user id, token) so a new token never reuses a principal resolved for another one
+principal_cache = TTLCache(maxsize=settings.principal_cache_size, ttl=settings.principal_cache_ttl_seconds)
+
+def invalidate_user(user_id: int):
+    principal_cache.discard_where(lambda key, principal: principal.id == user_id)
+
+def invalidate_role(role_id: int):
+    principal_cache.discard_where(lambda key, principal: principal.role_id == role_id)
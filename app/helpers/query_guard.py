@@ -0,0 +1,71 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Literal
+
+# A parameter list such as "IN (?, ?, ?)" has one placeholder per value; collapsed so every length is one shape
+_PLACEHOLDER = r"(?:\?|\$\d+|%s|%\(\w+\)s|:\w+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+# Longest statement text quoted in a report
+SHAPE_PREVIEW_LENGTH = 200
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+# SQL text with its parameter lists collapsed: statements that differ only in their parameters share a shape
+@lru_cache(maxsize=4096)
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+# Set inside paged_statements(); MetricsMiddleware still counts those statements but does not record their shapes
+repeats_expected: ContextVar[bool] = ContextVar("repeats_expected", default=False)
+
+
+# Marks a keyset walk or a chunked write, which repeats one statement shape with new parameters by design, so
+# the query guard does not report it as N+1. Also a function decorator; in a generator wrap each page rather than
+# the whole walk, since its steps may run in different contexts.
+@contextmanager
+def paged_statements():
+    token = repeats_expected.set(True)
+    try:
+        yield
+    finally:
+        repeats_expected.reset(token)
+
+
+# Declares the most statements a route may run per request; goes below the @router.<method>(...) decorator
+def query_budget(max_statements: int):
+    def decorate(endpoint):
+        endpoint.query_budget = max_statements
+        return endpoint
+    return decorate
+
+
+# Development/test check run by MetricsMiddleware after each request: reports routes over their query_budget and
+# statement shapes repeated with repeat_threshold or more different parameter sets (a lazy load inside a loop)
+class QueryGuard:
+    def __init__(self, mode: Literal["warn", "raise"], repeat_threshold: int):
+        self.mode = mode
+        self.repeat_threshold = repeat_threshold
+
+    def check(self, method: str, route: str, endpoint, stats):
+        problems = []
+        budget = getattr(endpoint, "query_budget", None)
+        if budget is not None and stats.statements > budget:
+            problems.append(f"{stats.statements} statements, budget {budget}")
+
+        for shape, parameter_sets in stats.shapes.items():
+            if len(parameter_sets) >= self.repeat_threshold:
+                problems.append(f"N+1: {len(parameter_sets)} times with different parameters: {shape[:SHAPE_PREVIEW_LENGTH]}")
+
+        if not problems:
+            return
+        message = f"{method} {route}: " + "; ".join(problems)
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(message)
+        print(f"⚠️ {message}")
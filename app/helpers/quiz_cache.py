@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.helpers.cache import TTLCache
+from app.models.quiz_models import LessonQuiz, QuizQuestion
+
+
+@dataclass(frozen=True)
+class CompiledQuestion:
+    id: int
+    question: str
+    choices: Tuple[str, ...]
+    correct_answer: str
+
+
+# Everything needed to render or grade a quiz, built once from lesson_quizzes + quiz_questions.
+# Shared by every request that hits the cache, so its collections are read-only; copy them into responses.
+@dataclass(frozen=True)
+class CompiledQuiz:
+    id: int
+    lesson_id: Optional[int]
+    title: str
+    max_attempts: int
+    passing_score: Decimal
+    questions: Tuple[CompiledQuestion, ...]
+    correct_map: Mapping[int, str]
+
+    @classmethod
+    def compile(cls, quiz: LessonQuiz, questions) -> "CompiledQuiz":
+        compiled = tuple(
+            CompiledQuestion(id=q.id, question=q.question, choices=tuple(q.choices or ()), correct_answer=q.correct_answer)
+            for q in questions
+        )
+        return cls(
+            id=quiz.id,
+            lesson_id=quiz.lesson_id,
+            title=quiz.title,
+            max_attempts=quiz.max_attempts,
+            passing_score=quiz.passing_score,
+            questions=compiled,
+            correct_map=MappingProxyType({q.id: q.correct_answer for q in compiled}),
+        )
+
+
+# Quiz id -> CompiledQuiz, and lesson id -> quiz id (None when the lesson has no quiz).
+# Writes in this process invalidate both; the TTL bounds staleness across worker processes.
+quiz_cache = TTLCache(maxsize=settings.quiz_cache_size, ttl=settings.quiz_cache_ttl_seconds)
+lesson_quiz_cache = TTLCache(maxsize=settings.quiz_cache_size, ttl=settings.quiz_cache_ttl_seconds)
+
+_MISSING = object()
+
+
+def get_compiled_quiz(db: Session, quiz_id: int) -> Optional[CompiledQuiz]:
+    compiled = quiz_cache.get(quiz_id)
+    if compiled is not None:
+        return compiled
+
+    quiz = db.query(LessonQuiz).filter_by(id=quiz_id).first()
+    if not quiz:
+        return None
+
+    questions = db.query(QuizQuestion).filter_by(quiz_id=quiz_id).order_by(QuizQuestion.id).all()
+    compiled = CompiledQuiz.compile(quiz, questions)
+    quiz_cache.set(quiz_id, compiled)
+    return compiled
+
+def get_compiled_quiz_for_lesson(db: Session, lesson_id: int) -> Optional[CompiledQuiz]:
+    quiz_id = lesson_quiz_cache.get(lesson_id, _MISSING)
+    if quiz_id is _MISSING:
+        quiz_id = db.query(LessonQuiz.id).filter_by(lesson_id=lesson_id).order_by(LessonQuiz.id).limit(1).scalar()
+        lesson_quiz_cache.set(lesson_id, quiz_id)
+
+    if quiz_id is None:
+        return None
+    return get_compiled_quiz(db, quiz_id)
+
+# Call after the write has been committed. A reader that loaded the old rows before the commit can still cache
+# them afterwards; the TTL bounds how long they are served.
+def invalidate_quiz(quiz_id: int, lesson_id: Optional[int] = None):
+    quiz_cache.pop(quiz_id)
+    if lesson_id is not None:
+        lesson_quiz_cache.pop(lesson_id)
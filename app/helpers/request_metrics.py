@@ -0,0 +1,174 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.helpers.query_guard import QueryGuard, repeats_expected, statement_shape
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Label for requests that matched no route, so unknown paths cannot grow the label set
+UNMATCHED_ROUTE = "unmatched"
+
+
+# Statements and database time of one request; with a query guard also each statement shape's parameter sets
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "shapes")
+
+    def __init__(self, track_shapes: bool = False):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.shapes: Optional[Dict[str, Set[str]]] = {} if track_shapes else None
+
+
+# Set by MetricsMiddleware for the request being served. The threadpool and AsyncSession.run_sync copy the
+# context, so statements run there are counted against the same RequestStats.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None:
+        conn.info["metrics_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    started = conn.info.pop("metrics_started", None)
+    if stats is not None and started is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - started
+        if stats.shapes is not None and not repeats_expected.get():
+            stats.shapes.setdefault(statement_shape(statement), set()).add(repr(parameters))
+
+# Count statements and database time per request on this (sync) engine; pass async_engine.sync_engine for async
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per upper bound plus +Inf; rendered cumulatively
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.responses[(method, route, status)] = self.responses.get((method, route, status), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.statements[key] = Histogram(STATEMENT_BUCKETS)
+                self.db_seconds[key] = 0.0
+            self.latency[key].observe(seconds)
+            self.statements[key].observe(stats.statements)
+            self.db_seconds[key] += stats.db_seconds
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += metric_header("http_requests_total", "counter", "Responses sent, by route and status")
+            for (method, route, status), value in sorted(self.responses.items()):
+                lines.append(sample("http_requests_total", {"method": method, "route": route, "status": status}, value))
+            lines += histogram_lines("http_request_duration_seconds", "Time until the response completed", self.latency)
+            lines += histogram_lines("db_statements_per_request", "SQL statements executed per request", self.statements)
+            lines += metric_header("db_query_duration_seconds_total", "counter", "Time spent in SQL statements")
+            for (method, route), value in sorted(self.db_seconds.items()):
+                lines.append(sample("db_query_duration_seconds_total", {"method": method, "route": route}, round(value, 6)))
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RouteMetrics()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def sample(name: str, labels: Dict[str, object], value) -> str:
+    if not labels:
+        return f"{name} {value}"
+    rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f"{name}{{{rendered}}} {value}"
+
+def metric_header(name: str, kind: str, help_text: str) -> Iterable[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+def histogram_lines(name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]) -> Iterable[str]:
+    lines = list(metric_header(name, "histogram", help_text))
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = {"method": method, "route": route}
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(sample(f"{name}_bucket", {**labels, "le": bound}, cumulative))
+        lines.append(sample(f"{name}_sum", labels, round(histogram.sum, 6)))
+        lines.append(sample(f"{name}_count", labels, histogram.count))
+    return lines
+
+
+# Route template ("/users/{user_id}") rather than the raw path, so one label value covers every id
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+# Pure ASGI so streaming responses pass through untouched. Server-Timing and X-DB-Queries describe the request up
+# to the moment its headers are sent; statements run while a streamed body is produced are only in /metrics.
+# Either part can be switched off: metrics=None records nothing, guard=None skips the query guard.
+class MetricsMiddleware:
+    def __init__(self, app, metrics: Optional[RouteMetrics] = request_metrics, response_headers: bool = True,
+                 guard: Optional[QueryGuard] = None):
+        self.app = app
+        self.metrics = metrics
+        self.response_headers = response_headers
+        self.guard = guard
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(track_shapes=self.guard is not None)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.response_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", f"app;dur={(time.perf_counter() - started) * 1000:.1f}, "
+                                                    f"db;dur={stats.db_seconds * 1000:.1f}")
+                    headers.append("X-DB-Queries", str(stats.statements))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            if self.metrics is not None:
+                self.metrics.observe(scope["method"], _route_label(scope), status, time.perf_counter() - started, stats)
+        # Only after a completed request, so a failure inside the route is not masked
+        if self.guard is not None:
+            self.guard.check(scope["method"], _route_label(scope), getattr(scope.get("route"), "endpoint", None), stats)
@@ -0,0 +1,140 @@
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.helpers.cache import TTLCache
+from app.models.student_attendance import AttendanceSession
+
+WINDOW_COLUMNS = (
+    AttendanceSession.id,
+    AttendanceSession.course_id,
+    AttendanceSession.lesson_id,
+    AttendanceSession.start_time,
+    AttendanceSession.end_time,
+    AttendanceSession.type,
+)
+
+
+# An attendance session as read by the check-in and polling paths: its course and when it is open
+@dataclass(frozen=True)
+class SessionWindow:
+    id: int
+    course_id: int
+    lesson_id: Optional[int]
+    start_time: datetime
+    end_time: datetime
+    type: str
+
+    @classmethod
+    def from_session(cls, session: AttendanceSession) -> "SessionWindow":
+        return cls(*(getattr(session, column.key) for column in WINDOW_COLUMNS))
+
+    def is_open(self, at: datetime) -> bool:
+        return self.start_time <= at <= self.end_time
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return self.start_time <= end and self.end_time >= start
+
+
+# Session id -> SessionWindow; sessions are never edited after creation, so only the TTL expires them
+session_window_cache = TTLCache(
+    maxsize=settings.session_window_cache_size,
+    ttl=settings.session_window_cache_ttl_seconds
+)
+
+
+def get_session_window(db: Session, session_id: int) -> Optional[SessionWindow]:
+    window = session_window_cache.get(session_id)
+    if window is not None:
+        return window
+
+    row = db.execute(select(*WINDOW_COLUMNS).where(AttendanceSession.id == session_id)).first()
+    if not row:
+        return None
+
+    window = SessionWindow(*row)
+    session_window_cache.set(session_id, window)
+    return window
+
+
+# Course id -> sessions open at some point in [loaded_at, loaded_at + horizon]. Any session open at a time t
+# inside that range is in the index, so lookups are exact until the horizon is reached. The index is
+# rebuilt after refresh_interval (sessions created by other worker processes appear then) and sessions
+# created in this process are added as they are committed.
+class ActiveSessionIndex:
+    def __init__(self, horizon: timedelta, refresh_interval: timedelta):
+        self.horizon = horizon
+        self.refresh_interval = min(refresh_interval, horizon)
+        self._by_course: Dict[int, List[SessionWindow]] = {}
+        self._loaded_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _is_stale(self, now: datetime) -> bool:
+        return (
+            self._loaded_at is None
+            or now < self._loaded_at
+            or now >= self._loaded_at + self.refresh_interval
+        )
+
+    def refresh(self, db: Session, now: datetime):
+        until = now + self.horizon
+        rows = db.execute(
+            select(*WINDOW_COLUMNS)
+            .where(AttendanceSession.end_time >= now, AttendanceSession.start_time <= until)
+        ).all()
+
+        by_course = defaultdict(list)
+        for row in rows:
+            window = SessionWindow(*row)
+            by_course[window.course_id].append(window)
+
+        with self._lock:
+            # Concurrent rebuilds may finish out of order; keep the newest
+            if self._loaded_at is None or self._loaded_at <= now:
+                self._by_course = dict(by_course)
+                self._loaded_at = now
+
+    def add(self, window: SessionWindow):
+        with self._lock:
+            if self._loaded_at is None or not window.overlaps(self._loaded_at, self._loaded_at + self.horizon):
+                return
+            sessions = [s for s in self._by_course.get(window.course_id, []) if s.id != window.id]
+            self._by_course[window.course_id] = sessions + [window]
+
+    def _covers(self, now: datetime) -> bool:
+        return self._loaded_at is not None and self._loaded_at <= now <= self._loaded_at + self.horizon
+
+    def active_for_courses(self, db: Session, course_ids: Iterable[int], now: datetime) -> List[SessionWindow]:
+        if self._is_stale(now):
+            # Never wait for another caller's rebuild: in async mode this runs on the event loop thread, where the
+            # rebuilding caller may be suspended on its query. While one rebuild runs, the others keep serving
+            # the stale index as long as it still covers now, and rebuild on their own otherwise.
+            if self._refresh_lock.acquire(blocking=False):
+                try:
+                    if self._is_stale(now):
+                        self.refresh(db, now)
+                finally:
+                    self._refresh_lock.release()
+            elif not self._covers(now):
+                self.refresh(db, now)
+
+        by_course = self._by_course
+        return [
+            window
+            for course_id in course_ids
+            for window in by_course.get(course_id, ())
+            if window.is_open(now)
+        ]
+
+
+active_sessions = ActiveSessionIndex(
+    horizon=timedelta(minutes=settings.active_session_horizon_minutes),
+    refresh_interval=timedelta(seconds=settings.active_session_refresh_seconds)
+)
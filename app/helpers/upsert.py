@@ -0,0 +1,12 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+# Return an INSERT construct for the session's dialect that supports ON CONFLICT clauses
+def dialect_insert(db: Session, table):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise RuntimeError(f"ON CONFLICT inserts are not supported for the '{dialect}' dialect")
@@ -0,0 +1,255 @@
+import bisect
+import re
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.models.user import User
+
+# Terms shorter than one trigram can only be matched as prefixes
+TRIGRAM_LENGTH = 3
+# In-memory substring matches given an exact similarity score, as a multiple of the requested count
+SIMILARITY_RERANK_FACTOR = 4
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+# Trigrams as pg_trgm builds them for similarity(): each alphanumeric word padded with "  " and " "
+def word_trigrams(text: str) -> Set[str]:
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+def _substring_trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# "/" rather than a backslash, whose meaning in string literals depends on standard_conforming_strings
+def _escape_like(term: str) -> str:
+    return term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+def _dedupe(ids) -> List[int]:
+    return list(dict.fromkeys(ids))
+
+
+# PostgreSQL: prefix matches come from the lower(...) COLLATE "C" indexes in index order, the rest from the GiST
+# trigram indexes (both migration V18). Each column is walked nearest-first by trigram distance (<->),
+# so a term most users contain (a mail domain) stops after `limit` rows instead of ranking every match.
+def _search_postgres(db: Session, term: str, role_id: Optional[int], limit: int) -> List[int]:
+    ids = []
+    prefix = _escape_like(term) + "%"
+    for column in (User.username, User.email):
+        key = func.lower(column).collate("C")
+        query = select(User.id).where(key.like(prefix, escape="/"))
+        if role_id:
+            query = query.where(User.role_id == role_id)
+        ids.extend(db.execute(query.order_by(key, User.id).limit(limit)).scalars())
+    ids = _dedupe(ids)[:limit]
+
+    if len(ids) == limit or len(term) < TRIGRAM_LENGTH:
+        return ids
+
+    pattern = "%" + _escape_like(term) + "%"
+    nearest = []
+    for column in (User.username, User.email):
+        distance = column.op("<->")(term)
+        query = select(User.id, distance).where(column.ilike(pattern, escape="/"))
+        if role_id:
+            query = query.where(User.role_id == role_id)
+        if ids:
+            query = query.where(User.id.notin_(ids))
+        # Ordered by the distance alone, which the GiST index returns directly
+        nearest.extend(db.execute(query.order_by(distance).limit(limit - len(ids))).all())
+    ids.extend(_dedupe(user_id for user_id, _ in sorted(nearest, key=lambda row: (row[1], row[0]))))
+    return ids[:limit]
+
+
+# Posting entries pack (length of the user's shorter value, user id) into one integer, so each trigram's posting
+# list is a compact sorted array in shortest-first order
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+def _posting_key(user_id: int, username: str, email: str) -> int:
+    return (min(len(username), len(email)) << _ID_BITS) | user_id
+
+def _new_posting() -> array:
+    return array("q")
+
+
+# Other databases: username/email trigram postings and sorted prefix lists kept in memory. The scheduler rebuilds
+# the index every refresh_interval (users created by other worker processes appear then), and users written in
+# this process are applied as they are committed. Only the first search in a process that the scheduler has not
+# reached yet builds it on the request path.
+class UserNgramIndex:
+    def __init__(self):
+        self._entries: Dict[int, Tuple[str, str, Optional[int]]] = {}
+        self._postings: Dict[str, array] = defaultdict(_new_posting)
+        self._usernames: List[Tuple[str, int]] = []
+        self._emails: List[Tuple[str, int]] = []
+        self._loaded_at: Optional[datetime] = None
+        # Users added while a rebuild reads the table, applied again to the rebuilt index
+        self._added_during_refresh: Optional[List[Tuple[int, str, str, Optional[int]]]] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _insert(self, user_id: int, username: str, email: str, role_id: Optional[int]):
+        self._entries[user_id] = (username, email, role_id)
+        key = _posting_key(user_id, username, email)
+        for gram in _substring_trigrams(username) | _substring_trigrams(email):
+            bisect.insort(self._postings[gram], key)
+        bisect.insort(self._usernames, (username, user_id))
+        bisect.insort(self._emails, (email, user_id))
+
+    def _remove(self, user_id: int):
+        username, email, _ = self._entries.pop(user_id)
+        key = _posting_key(user_id, username, email)
+        for gram in _substring_trigrams(username) | _substring_trigrams(email):
+            postings = self._postings[gram]
+            position = bisect.bisect_left(postings, key)
+            if position < len(postings) and postings[position] == key:
+                del postings[position]
+        for values, value in ((self._usernames, username), (self._emails, email)):
+            position = bisect.bisect_left(values, (value, user_id))
+            if position < len(values) and values[position] == (value, user_id):
+                del values[position]
+
+    def refresh(self, db: Session):
+        with self._refresh_lock:
+            self._build(db)
+
+    def _build(self, db: Session):
+        with self._lock:
+            self._added_during_refresh = []
+        try:
+            loaded_at = datetime.now()
+            rows = db.execute(select(User.id, User.username, User.email, User.role_id)).all()
+
+            entries = {
+                user_id: ((username or "").lower(), (email or "").lower(), role_id)
+                for user_id, username, email, role_id in rows
+            }
+            keys = defaultdict(list)
+            for user_id, (username, email, _) in entries.items():
+                key = _posting_key(user_id, username, email)
+                for gram in _substring_trigrams(username) | _substring_trigrams(email):
+                    keys[gram].append(key)
+            postings = defaultdict(_new_posting, ((gram, array("q", sorted(values))) for gram, values in keys.items()))
+            usernames = sorted((username, user_id) for user_id, (username, _, _) in entries.items())
+            emails = sorted((email, user_id) for user_id, (_, email, _) in entries.items())
+
+            with self._lock:
+                self._entries, self._postings = entries, postings
+                self._usernames, self._emails = usernames, emails
+                self._loaded_at = loaded_at
+                for values in self._added_during_refresh:
+                    self._apply(*values)
+        finally:
+            with self._lock:
+                self._added_during_refresh = None
+
+    def _apply(self, user_id: int, username: str, email: str, role_id: Optional[int]):
+        if user_id in self._entries:
+            self._remove(user_id)
+        self._insert(user_id, username, email, role_id)
+
+    # Apply a committed insert or update; until the index is first built only a running build needs it
+    def add(self, user: User):
+        values = (user.id, (user.username or "").lower(), (user.email or "").lower(), user.role_id)
+        with self._lock:
+            if self._added_during_refresh is not None:
+                self._added_during_refresh.append(values)
+            if self._loaded_at is not None:
+                self._apply(*values)
+
+    def _matches_role(self, user_id: int, role_id: Optional[int]) -> bool:
+        return not role_id or self._entries[user_id][2] == role_id
+
+    def _prefix_matches(self, term: str, role_id: Optional[int], limit: int) -> List[int]:
+        ids = []
+        for values in (self._usernames, self._emails):
+            found = 0
+            position = bisect.bisect_left(values, (term,))
+            while found < limit and position < len(values) and values[position][0].startswith(term):
+                user_id = values[position][1]
+                if self._matches_role(user_id, role_id):
+                    ids.append(user_id)
+                    found += 1
+                position += 1
+        return _dedupe(ids)[:limit]
+
+    def _substring_matches(self, term: str, role_id: Optional[int], limit: int, exclude: Set[int]) -> List[int]:
+        postings = [self._postings.get(gram) for gram in _substring_trigrams(term)]
+        if not all(postings):
+            return []
+
+        # Every match is in each of the term's posting lists, so the shortest one is walked shortest value first,
+        # keeping the first matches as a cheap stand-in for similarity; only those get the exact score. A term
+        # most users contain (a mail domain) stops after a few hundred entries.
+        wanted = limit * SIMILARITY_RERANK_FACTOR
+        candidates = []
+        for key in min(postings, key=len):
+            user_id = key & _ID_MASK
+            if user_id in exclude:
+                continue
+            username, email, _ = self._entries[user_id]
+            if (term in username or term in email) and self._matches_role(user_id, role_id):
+                candidates.append(user_id)
+                if len(candidates) == wanted:
+                    break
+
+        term_grams = word_trigrams(term)
+        scored = []
+        for user_id in candidates:
+            username, email, _ = self._entries[user_id]
+            score = max(similarity(word_trigrams(username), term_grams), similarity(word_trigrams(email), term_grams))
+            scored.append((-score, user_id))
+        return [user_id for _, user_id in sorted(scored)[:limit]]
+
+    def search(self, db: Session, term: str, role_id: Optional[int], limit: int) -> List[int]:
+        if self._loaded_at is None:
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self._build(db)
+
+        with self._lock:
+            ids = self._prefix_matches(term, role_id, limit)
+            if len(ids) < limit and len(term) >= TRIGRAM_LENGTH:
+                ids += self._substring_matches(term, role_id, limit - len(ids), set(ids))
+        return ids
+
+
+user_search_index = UserNgramIndex()
+
+# Scheduler job; PostgreSQL searches through its indexes and needs no in-memory copy
+def refresh_user_search_index(db: Session):
+    if db.get_bind().dialect.name != "postgresql":
+        user_search_index.refresh(db)
+
+
+# Best `limit` users whose username or email contains the term: prefix matches first (alphabetically, usernames
+# before emails), then the other matches by trigram similarity
+def search_users(db: Session, term: str, role_id: Optional[int], limit: int) -> List[User]:
+    term = term.strip().lower()
+    if not term:
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        ids = _search_postgres(db, term, role_id, limit)
+    else:
+        ids = user_search_index.search(db, term, role_id, limit)
+    if not ids:
+        return []
+
+    users = {user.id: user for user in db.query(User).options(joinedload(User.role)).filter(User.id.in_(ids))}
+    return [users[user_id] for user_id in ids if user_id in users]
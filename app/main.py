@@ -1,6 +1,7 @@
 import subprocess
 
 from fastapi import FastAPI, Depends
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
@@ -8,8 +9,16 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.status import HTTP_401_UNAUTHORIZED
 
 from app.auth import get_current_user
+from app.config import settings
+from app.database import SessionLocal, engine, async_engine
+from app.helpers.audit import audit_writer
+from app.helpers.counters import flush_counter_deltas
+from app.helpers.password_pool import password_pool
+from app.helpers.query_guard import QueryGuard
+from app.helpers.request_metrics import MetricsMiddleware, instrument_engine, request_metrics
 from app.routers import user as user_router, role as role_router, course as course_router, auth as auth_router, \
-    lesson as lesson_router, quiz as quiz_router, admin as admin_router,  attendance as attendance_router
+    lesson as lesson_router, quiz as quiz_router, admin as admin_router,  attendance as attendance_router, \
+    metrics as metrics_router
 from app.scheduler import start_scheduler
 
 app = FastAPI()
@@ -24,7 +33,7 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
                 "message": "You must include a valid Authorization token to access this resource."
             }
         )
-    return await request.app.default_exception_handler(request, exc)
+    return await http_exception_handler(request, exc)
 
 
 # You can add additional URLs to this list, for example, the frontend's production domain, or other frontends.
@@ -38,12 +47,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # includes OPTIONS
     allow_headers=["*"],  # includes Authorization
+    expose_headers=["Server-Timing", "X-DB-Queries"],
 )
 
+query_guard = (
+    QueryGuard(settings.query_guard, settings.query_guard_repeat_threshold) if settings.query_guard != "off" else None
+)
+
+# Added last so it wraps CORS and times the whole request
+if settings.metrics_enabled or query_guard is not None:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    app.add_middleware(
+        MetricsMiddleware,
+        metrics=request_metrics if settings.metrics_enabled else None,
+        response_headers=settings.metrics_enabled and settings.metrics_response_headers,
+        guard=query_guard,
+    )
+
 @app.on_event("startup")
 def on_startup():
     subprocess.run(["alembic", "upgrade", "head"])
     start_scheduler()
+    audit_writer.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    password_pool.shutdown()
+    audit_writer.stop()
+    with SessionLocal() as db:
+        flush_counter_deltas(db)
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app.include_router(user_router.router,dependencies=[Depends(get_current_user)])
 app.include_router(role_router.router, dependencies=[Depends(get_current_user)])
@@ -53,3 +89,5 @@ app.include_router(quiz_router.router, dependencies=[Depends(get_current_user)])
 app.include_router(admin_router.router, dependencies=[Depends(get_current_user)])
 app.include_router(attendance_router.router, dependencies=[Depends(get_current_user)])
 app.include_router(auth_router.router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router.router)
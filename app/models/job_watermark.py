@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.models import Base
+
+
+# Persisted "processed up to" position of a background job, so finished work is never rescanned
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+
+    name = Column(String, primary_key=True)
+    last_end_time = Column(DateTime, nullable=True)
+    last_session_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
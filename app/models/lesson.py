@@ -10,7 +10,7 @@ class Lesson(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=True)  # Optional lesson body
-    course_id = Column(Integer, ForeignKey("courses.id"))
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
 
     course = relationship("Course", back_populates="lessons")
     quiz = relationship("LessonQuiz", back_populates="lesson")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, func, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, func, Numeric, Index
 from sqlalchemy.orm import relationship
 
 from app.models import Base
@@ -7,7 +7,7 @@ from app.models import Base
 class LessonQuiz(Base):
     __tablename__ = "lesson_quizzes"
     id = Column(Integer, primary_key=True)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"))
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), index=True)
     title = Column(String, nullable=False)
     max_attempts = Column(Integer, nullable=False, default=1)
     passing_score = Column(Numeric(5, 2), nullable=False, default=70)  # in percent
@@ -18,7 +18,7 @@ class LessonQuiz(Base):
 class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
     id = Column(Integer, primary_key=True)
-    quiz_id = Column(Integer, ForeignKey("lesson_quizzes.id"))
+    quiz_id = Column(Integer, ForeignKey("lesson_quizzes.id"), index=True)
     question = Column(String, nullable=False)
     choices = Column(JSON)  # Expecting list of strings
     correct_answer = Column(String, nullable=False)
@@ -34,3 +34,8 @@ class StudentQuizResult(Base):
     selected_answers = Column(JSON)  # Dict[question_id] = selected_choice
     score = Column(Numeric(5, 2))
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_student_quiz_results_quiz_user', 'quiz_id', 'user_id'),
+        Index('ix_student_quiz_results_quiz_submitted', 'quiz_id', 'submitted_at', 'id'),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+
+from app.models import Base
+
+
+# Running totals behind the admin overview, adjusted by the write paths and periodically reconciled
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
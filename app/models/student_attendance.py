@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 
 from app.models import Base
@@ -18,6 +18,11 @@ class AttendanceSession(Base):
     course = relationship('Course')
     lesson = relationship('Lesson')
 
+    __table_args__ = (
+        Index('ix_attendance_sessions_course_window', 'course_id', 'start_time', 'end_time'),
+        Index('ix_attendance_sessions_window', 'end_time', 'start_time'),
+    )
+
 class StudentAttendance(Base):
     __tablename__ = 'student_attendances'
 
@@ -33,5 +38,6 @@ class StudentAttendance(Base):
 
     __table_args__ = (
         UniqueConstraint('attendance_session_id', 'user_id', name='uix_session_student'),
+        Index('ix_student_attendances_user_status', 'user_id', 'status'),
     )
 
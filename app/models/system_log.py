@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime, func, Index
 from sqlalchemy.orm import relationship
 
 from app.models import Base
@@ -14,3 +14,7 @@ class SystemLog(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User")
+
+    __table_args__ = (
+        Index('ix_system_logs_timestamp', 'timestamp', 'id'),
+    )
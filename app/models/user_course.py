@@ -8,7 +8,7 @@ from app.models import Base
 class UserCourse(Base):
     __tablename__ = "user_course"
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True, index=True)
     is_completed = Column(Boolean, default=False)
 
     user = relationship("User", back_populates="courses")
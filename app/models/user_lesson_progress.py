@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, Index
 from app.models import Base
 
 class UserLessonProgress(Base):
@@ -7,3 +7,8 @@ class UserLessonProgress(Base):
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True)
     is_completed = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index('ix_user_lesson_progress_user_completed', 'user_id', 'is_completed'),
+        Index('ix_user_lesson_progress_lesson_id', 'lesson_id'),
+    )
@@ -1,60 +1,79 @@
-from typing import Optional, List
+from typing import Optional, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.auth import get_current_user
 from app.crud import admin as admin_crud
-from app.database import SessionLocal
+from app.database import get_db, engine, async_engine
 from app.helpers.audit import log_action
-from app.models.user import User
+from app.helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.helpers.password_pool import password_pool
+from app.helpers.pool_metrics import pool_status
+from app.helpers.principals import Principal
+from app.helpers.query_guard import query_budget
 from app.schemas.course import CourseAdminResponse, CourseDetailResponse, CourseUpdate
+from app.schemas.pagination import Page
 from app.schemas.role import RoleResponse, RoleBase, AssignRoleRequest
 from app.schemas.system_log import SystemLogResponse
 from app.schemas.user import UserWithRoleResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def verify_admin(user: User = Depends(get_current_user)):
+def verify_admin(user: Principal = Depends(get_current_user)):
     if user.role.name != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
     return user
 
 @router.get("/overview")
 def get_admin_overview(
+    fresh: bool = False,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(verify_admin)
+    current_admin: Principal = Depends(verify_admin)
 ):
-    return admin_crud.get_admin_dashboard_data(db)
+    return admin_crud.get_admin_dashboard_data(db, fresh=fresh)
+
+@router.get("/pool")
+def get_pool_status(current_admin: Principal = Depends(verify_admin)):
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine) if async_engine is not None else None
+    }
 
-@router.get("/users", response_model=list[UserWithRoleResponse])
+@router.get("/password-hashing")
+def get_password_hashing_status(current_admin: Principal = Depends(verify_admin)):
+    return password_pool.stats()
+
+@router.get("/users", response_model=Page[UserWithRoleResponse])
 def list_users(
     search: Optional[str] = Query(None),
     role_id: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
-    current_admin: User = Depends(verify_admin)
+    current_admin: Principal = Depends(verify_admin)
 ):
-    return admin_crud.get_all_users(db, search=search, role_id=role_id)
+    return admin_crud.get_all_users(db, search=search, role_id=role_id, limit=limit, cursor=cursor)
 
-@router.get("/courses", response_model=List[CourseAdminResponse])
+@router.get("/courses", response_model=Page[CourseAdminResponse])
+@query_budget(2)
 def get_all_courses(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    sort_by: Literal["id", "title", "total_students", "lesson_count", "avg_completion_rate"] = Query("id"),
+    order: Literal["asc", "desc"] = Query("asc"),
     db: Session = Depends(get_db),
-    current_admin: User = Depends(verify_admin)
+    current_admin: Principal = Depends(verify_admin)
 ):
-    return admin_crud.get_all_courses_with_stats(db)
+    return admin_crud.get_all_courses_with_stats(
+        db, limit=limit, cursor=cursor, sort_by=sort_by, descending=order == "desc"
+    )
 
 @router.get("/courses/{course_id}/details", response_model=CourseDetailResponse)
 def view_course_details(
     course_id: int,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(verify_admin)
+    current_admin: Principal = Depends(verify_admin)
 ):
     return admin_crud.get_course_details(course_id, db)
 
@@ -63,7 +82,7 @@ def update_course(
     course_id: int,
     update_data: CourseUpdate,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(verify_admin)
+    current_admin: Principal = Depends(verify_admin)
 ):
     return admin_crud.update_course(course_id, update_data, db)
 
@@ -71,35 +90,45 @@ def update_course(
 def delete_course(
     course_id: int,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(verify_admin)
+    current_admin: Principal = Depends(verify_admin)
 ):
     return admin_crud.delete_course(course_id, db)
 
-@router.get("/roles", response_model=list[RoleResponse])
-def list_roles(db: Session = Depends(get_db), current_admin: User = Depends(verify_admin)):
-    return admin_crud.get_all_roles(db)
+@router.get("/roles", response_model=Page[RoleResponse])
+def list_roles(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: Principal = Depends(verify_admin)
+):
+    return admin_crud.get_all_roles(db, limit=limit, cursor=cursor)
 
 @router.post("/roles", response_model=RoleResponse)
-def create_role(role: RoleBase, db: Session = Depends(get_db), current_admin: User = Depends(verify_admin)):
+def create_role(role: RoleBase, db: Session = Depends(get_db), current_admin: Principal = Depends(verify_admin)):
     return admin_crud.create_role(role, db)
 
 @router.put("/roles/{role_id}", response_model=RoleResponse)
-def update_role(role_id: int, role: RoleBase, db: Session = Depends(get_db), current_admin: User = Depends(verify_admin)):
+def update_role(role_id: int, role: RoleBase, db: Session = Depends(get_db), current_admin: Principal = Depends(verify_admin)):
     return admin_crud.update_role(role_id, role, db)
 
 @router.delete("/roles/{role_id}")
-def delete_role(role_id: int, db: Session = Depends(get_db), current_admin: User = Depends(verify_admin)):
+def delete_role(role_id: int, db: Session = Depends(get_db), current_admin: Principal = Depends(verify_admin)):
     admin_crud.delete_role(role_id, db)
     return {"message": "Role deleted"}
 
 @router.patch("/users/assign_role")
-def assign_role(request: AssignRoleRequest, db: Session = Depends(get_db), current_admin: User = Depends(verify_admin)):
+def assign_role(request: AssignRoleRequest, db: Session = Depends(get_db), current_admin: Principal = Depends(verify_admin)):
     admin_crud.assign_role_to_user(request.user_id, request.role_id, db)
     log_action(db, user_id=current_admin.id, action="role_assigned",
                detail=f"Assigned role ID {request.role_id} to user ID {request.user_id}")
 
     return {"message": "Role assigned"}
 
-@router.get("/logs", response_model=list[SystemLogResponse])
-def fetch_system_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_admin=Depends(verify_admin)):
-    return admin_crud.get_system_logs(db, skip=skip, limit=limit)
\ No newline at end of file
+@router.get("/logs", response_model=Page[SystemLogResponse])
+def fetch_system_logs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin=Depends(verify_admin)
+):
+    return admin_crud.get_system_logs(db, limit=limit, cursor=cursor)
\ No newline at end of file
@@ -4,31 +4,22 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from jose.exceptions import ExpiredSignatureError
-from sqlalchemy.orm import Session
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
-from ..auth import verify_password, create_access_token, ALGORITHM, SECRET_KEY, create_refresh_token
+from ..auth import create_access_token, ALGORITHM, SECRET_KEY, create_refresh_token
 from ..crud import user as user_crud
-from ..database import SessionLocal
+from ..database import DbSession, get_session, run_db
 from ..helpers.audit import log_action
-from ..models.user import User
+from ..helpers.password_pool import password_pool
 from ..schemas.user import UserResponse, UserCreate
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 router = APIRouter(tags=["auth"])
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: DbSession = Depends(get_session)):
+    user = await run_db(db, user_crud.get_user_by_username, username=form_data.username)
+    if not user or not await password_pool.verify(form_data.password, user.password):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
     access_token = create_access_token(data={"sub": user.username, "user_id": user.id, "role_id": user.role_id})
@@ -47,12 +38,13 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return response
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+async def register(user_data: UserCreate, db: DbSession = Depends(get_session)):
+    existing_user = await run_db(db, user_crud.get_user_by_username, username=user_data.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    return user_crud.create_user(db, user_data)
+    hashed_password = await password_pool.hash(user_data.password)
+    return await run_db(db, user_crud.create_user, user=user_data, hashed_password=hashed_password)
 
 @router.post("/auth/refresh-token")
 def refresh_token(request: Request):
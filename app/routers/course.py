@@ -1,28 +1,24 @@
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..auth import get_current_user
 from ..crud import course as course_crud
-from ..database import SessionLocal
+from ..database import get_db
 from ..helpers.audit import log_action
-from ..models.user import User
+from ..helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..helpers.principals import Principal
+from ..helpers.query_guard import query_budget
 from ..schemas import course as course_schema
+from ..schemas.pagination import Page
 from ..schemas import user as user_schema
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Create a new course
 @router.post("/", response_model=course_schema.CourseResponse)
-def create_course(course: course_schema.CourseCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_course(course: course_schema.CourseCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     if current_user.role_id != 1:
         raise HTTPException(status_code=403, detail="Only teachers can create courses")
 
@@ -31,7 +27,7 @@ def create_course(course: course_schema.CourseCreate, db: Session = Depends(get_
 
 # Update an existing course
 @router.put("/{course_id}", response_model=course_schema.CourseResponse)
-def update_course(course_id: int, course: course_schema.CourseUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def update_course(course_id: int, course: course_schema.CourseUpdate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     if current_user.role_id != 1 or course.creator_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed to edit this course")
 
@@ -39,42 +35,59 @@ def update_course(course_id: int, course: course_schema.CourseUpdate, db: Sessio
 
 # Teacher enroll a user to specific course
 @router.post("/{course_id}/enroll-user/{user_id}")
-def enroll_user_by_teacher(course_id: int, user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def enroll_user_by_teacher(course_id: int, user_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     return course_crud.enroll_user_by_teacher(course_id, user_id, db, current_user)
 
 # Mark course as completed
 @router.patch("/{course_id}/complete")
-def mark_course_complete(course_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def mark_course_complete(course_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     return course_crud.mark_course_complete(course_id, current_user.id, db)
 
 # Get all courses
-@router.get("/", response_model=List[course_schema.CourseResponse])
-def get_courses(db: Session = Depends(get_db)):
-    return course_crud.get_courses(db=db)
+@router.get("/", response_model=Page[course_schema.CourseResponse])
+def get_courses(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    return course_crud.get_courses(db=db, limit=limit, cursor=cursor)
 
 # Enroll user in course by themselves
 @router.post("/{course_id}/enroll")
-def enroll_user(course_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def enroll_user(course_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     if not current_user:
         raise HTTPException(status_code=400, detail="Not logged in!")
     return course_crud.enroll_user(user_id=current_user.id, course_id=course_id, db=db)
 
 # get all enrolled courses of a student
-@router.get("/by-user/{user_id}", response_model=List[course_schema.CourseWithProgress])
-def get_courses_by_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("/by-user/{user_id}", response_model=Page[course_schema.CourseWithProgress])
+@query_budget(2)
+def get_courses_by_user(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    return course_crud.get_courses_by_user(user_id, db)
+    return course_crud.get_courses_by_user(user_id, db, limit=limit, cursor=cursor)
 
 # get enrolled students in a Course
-@router.get("/by-course/{course_id}/users", response_model=List[user_schema.UserResponse])
-def get_users_by_course(course_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return course_crud.get_users_by_course(course_id, db, current_user.id)
+@router.get("/by-course/{course_id}/users", response_model=Page[user_schema.UserResponse])
+def get_users_by_course(
+    course_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return course_crud.get_users_by_course(course_id, db, current_user.id, limit=limit, cursor=cursor)
 
 # delete course by id
 @router.delete("/{course_id}")
-def delete_course(course_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_course(course_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     if current_user.role_id != 1:
         raise HTTPException(status_code=403, detail="Only teachers can delete courses")
 
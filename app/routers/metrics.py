@@ -0,0 +1,76 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.auth import get_current_user, oauth2_scheme
+from app.config import settings
+from app.database import DbSession, async_engine, engine, get_session
+from app.helpers.audit import audit_writer
+from app.helpers.password_pool import password_pool
+from app.helpers.pool_metrics import pool_status
+from app.helpers.request_metrics import metric_header, request_metrics, sample
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (stats key, metric name, type, help) for the dictionaries behind /admin/pool, /admin/password-hashing and the audit writer
+POOL_METRICS = [
+    ("size", "db_pool_size", "gauge", "Configured pool size"),
+    ("checked_out", "db_pool_checked_out", "gauge", "Connections in use"),
+    ("idle", "db_pool_idle", "gauge", "Connections idle in the pool"),
+    ("overflow", "db_pool_overflow", "gauge", "Connections open beyond the pool size"),
+    ("checkouts", "db_pool_checkouts_total", "counter", "Successful connection checkouts"),
+    ("checkout_timeouts", "db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up after pool_timeout"),
+    ("checkout_wait_seconds_total", "db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection"),
+    ("checkout_wait_seconds_max", "db_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a connection"),
+]
+PASSWORD_METRICS = [
+    ("in_flight", "password_hash_in_flight", "gauge", "bcrypt calls running or queued"),
+    ("queue_depth", "password_hash_queue_depth", "gauge", "bcrypt calls waiting for a worker"),
+    ("completed", "password_hash_completed_total", "counter", "bcrypt calls completed"),
+    ("failed", "password_hash_failed_total", "counter", "bcrypt calls that raised or lost their worker"),
+    ("rejected", "password_hash_rejected_total", "counter", "bcrypt calls rejected with 503"),
+    ("latency_seconds_max", "password_hash_latency_seconds_max", "gauge", "Slowest bcrypt call"),
+]
+AUDIT_METRICS = [
+    ("queue_depth", "audit_queue_depth", "gauge", "Audit rows waiting to be written"),
+    ("written", "audit_written_total", "counter", "Audit rows written"),
+    ("dropped", "audit_dropped_total", "counter", "Audit rows dropped on a full queue"),
+    ("spilled", "audit_spilled_total", "counter", "Audit rows spilled to the file on a full queue"),
+    ("failed_batches", "audit_failed_batches_total", "counter", "Audit batches that failed to insert"),
+]
+
+
+def _stats_lines(spec, labelled_stats):
+    lines = []
+    for key, name, kind, help_text in spec:
+        values = [(labels, stats[key]) for labels, stats in labelled_stats if stats.get(key) is not None]
+        if values:
+            lines += metric_header(name, kind, help_text)
+            lines += [sample(name, labels, value) for labels, value in values]
+    return lines
+
+def render_metrics() -> str:
+    pools = [({"engine": "sync"}, pool_status(engine))]
+    if async_engine is not None:
+        pools.append(({"engine": "async"}, pool_status(async_engine.sync_engine)))
+
+    lines = _stats_lines(POOL_METRICS, pools)
+    lines += _stats_lines(PASSWORD_METRICS, [({}, password_pool.stats())])
+    lines += _stats_lines(AUDIT_METRICS, [({}, audit_writer.stats())])
+    return request_metrics.render() + "\n".join(lines) + "\n"
+
+# A scraper presents METRICS_TOKEN as its bearer token and skips the database; anyone else must be an admin
+async def verify_metrics_reader(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_session)):
+    if settings.metrics_token and hmac.compare_digest(token.encode(), settings.metrics_token.encode()):
+        return
+    user = await get_current_user(token, db)
+    if user.role.name != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+# Prometheus text exposition format; disable with METRICS_ENABLED=false
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(verify_metrics_reader)])
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
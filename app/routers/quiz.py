@@ -1,76 +1,90 @@
-import csv
-from io import StringIO
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
 
 from app.auth import get_current_user
+from app.config import settings
 from app.crud import quiz as quiz_crud
-from app.database import SessionLocal
+from app.database import DbSession, get_session, run_db
 from app.helpers.audit import log_action
-from app.models.user import User
+from app.helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.helpers.principals import Principal
+from app.helpers.query_guard import query_budget
 from app.schemas.quiz import QuizCreate, QuizSubmitRequest, QuizUpdate
 
 router = APIRouter(prefix="/quizzes", tags=["Quizzes"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", status_code=201)
-def create_quiz(quiz: QuizCreate, db: Session = Depends(get_db)):
-    return quiz_crud.create_quiz_with_questions(quiz, db)
+async def create_quiz(quiz: QuizCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, quiz_crud.create_quiz_with_questions, quiz)
+
+# NDJSON body, one quiz per line; all quizzes are validated first and written in one transaction.
+# The body is read in chunks and rejected as soon as it passes the size limit.
+@router.post("/import", status_code=201)
+async def import_quizzes(
+    request: Request,
+    db: DbSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.role.name.lower() not in ("teacher", "admin"):
+        raise HTTPException(status_code=403, detail="Only teachers or admins may import quizzes")
+
+    too_large = HTTPException(status_code=413, detail=f"Import body is larger than {settings.quiz_import_max_bytes} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > settings.quiz_import_max_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.quiz_import_max_bytes:
+            raise too_large
+
+    try:
+        lines = body.decode("utf-8").splitlines()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 encoded NDJSON")
+    return await run_db(db, quiz_crud.import_quizzes, lines, max_quizzes=settings.quiz_import_max_quizzes)
 
 @router.get("/by-lesson/{lesson_id}")
-def get_quiz_by_lesson(lesson_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    quiz = quiz_crud.get_quiz_by_lesson(lesson_id, current_user.id, db)
+@query_budget(5)
+async def get_quiz_by_lesson(lesson_id: int, db: DbSession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    quiz = await run_db(db, quiz_crud.get_quiz_by_lesson, lesson_id, current_user.id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     return quiz
 
 @router.post("/submit")
-def submit_quiz(submission: QuizSubmitRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@query_budget(7)
+async def submit_quiz(submission: QuizSubmitRequest, db: DbSession = Depends(get_session), current_user: Principal = Depends(get_current_user)):
     log_action(db, user_id=current_user.id, action="quiz_submitted",
                detail=f"Quiz ID: {submission.quiz_id}")
-    return quiz_crud.submit_quiz(submission, user_id=current_user.id, db=db)
+    return await run_db(db, quiz_crud.submit_quiz, submission, user_id=current_user.id)
 
 @router.put("/{quiz_id}")
-def update_quiz(quiz_id: int, data: QuizUpdate, db: Session = Depends(get_db)):
-    return quiz_crud.update_quiz(quiz_id, data, db)
+async def update_quiz(quiz_id: int, data: QuizUpdate, db: DbSession = Depends(get_session)):
+    return await run_db(db, quiz_crud.update_quiz, quiz_id, data)
 
 @router.delete("/{quiz_id}")
-def delete_quiz(quiz_id: int, db: Session = Depends(get_db)):
-    return quiz_crud.delete_quiz(quiz_id, db)
+async def delete_quiz(quiz_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, quiz_crud.delete_quiz, quiz_id)
 
 @router.get("/{quiz_id}/results")
-def get_quiz_results(
+async def get_quiz_results(
     quiz_id: int,
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    latest_only: bool = False,
+    db: DbSession = Depends(get_session)
 ):
     # Optional: Check if user is a teacher/owner of the course
-    return quiz_crud.get_quiz_results(quiz_id, db)
+    return await run_db(db, quiz_crud.get_quiz_results, quiz_id, limit=limit, cursor=cursor, latest_only=latest_only)
 
-@router.get("/{quiz_id}/results/export")
-def export_quiz_results_csv(
+@router.get("/{quiz_id}/results/export", response_class=StreamingResponse)
+async def export_quiz_results_csv(
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    latest_only: bool = False,
+    db: DbSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    results = quiz_crud.get_quiz_results(quiz_id, db)
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Username", "Email", "Score", "Submitted At", "Answers"])
-
-    for r in results:
-        answer_str = "; ".join([f"Q{qid}: {ans}" for qid, ans in r["selected_answers"].items()])
-        writer.writerow([r["username"], r["email"], r["score"], r["submitted_at"], answer_str])
-
-    output.seek(0)
-    return StreamingResponse(output, media_type="text/csv", headers={
-        "Content-Disposition": f"attachment; filename=quiz_{quiz_id}_results.csv"
-    })
\ No newline at end of file
+    return await run_db(db, quiz_crud.export_quiz_results_csv, quiz_id, latest_only=latest_only)
@@ -1,26 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..crud import role as crud
-from ..database import SessionLocal
+from ..database import get_db
+from ..helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..schemas import role as schema
+from ..schemas.pagination import Page
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schema.RoleResponse)
 def create_role(role: schema.RoleBase, db: Session = Depends(get_db)):
     return crud.create_role(db, role)
 
-@router.get("/", response_model=list[schema.RoleResponse])
-def read_roles(db: Session = Depends(get_db)):
-    return crud.get_roles(db)
+@router.get("/", response_model=Page[schema.RoleResponse])
+def read_roles(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    return crud.get_roles(db, limit=limit, cursor=cursor)
+
+@router.get("/search", response_model=Page[schema.RoleResponse])
+def search_role(
+    name: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    return crud.search_role(db, name, limit=limit, cursor=cursor)
 
 @router.get("/{role_id}", response_model=schema.RoleResponse)
 def read_role(role_id: int, db: Session = Depends(get_db)):
@@ -30,10 +40,6 @@ def read_role(role_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Role not found")
     return role
 
-@router.get("/search", response_model=list[schema.RoleResponse])
-def search_role(name: str, db: Session = Depends(get_db)):
-    return crud.search_role(db, name)
-
 @router.delete("/{role_id}")
 def delete_role(role_id: int, db: Session = Depends(get_db)):
     role = crud.delete_role(db, role_id)
@@ -1,28 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..auth import get_current_user
 from ..crud import user as crud, feedback as feedback_crud, course as course_crud
-from ..database import SessionLocal
-from ..models.user import User
+from ..database import DbSession, get_db, get_session, run_db
+from ..helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..helpers.password_pool import password_pool
+from ..helpers.principals import Principal
+from ..helpers.query_guard import query_budget
 from ..schemas import user as schema, feedback as feedback_schema
+from ..schemas.pagination import Page
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schema.UserResponse)
-def create_user(user: schema.UserCreate, db: Session = Depends(get_db)):
-    return crud.create_user(db, user)
+async def create_user(user: schema.UserCreate, db: DbSession = Depends(get_session)):
+    hashed_password = await password_pool.hash(user.password)
+    return await run_db(db, crud.create_user, user=user, hashed_password=hashed_password)
 
-@router.get("/", response_model=list[schema.UserResponse])
-def read_users(db: Session = Depends(get_db)):
-    return crud.get_users(db)
+@router.get("/", response_model=Page[schema.UserResponse])
+def read_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    return crud.get_users(db, limit=limit, cursor=cursor)
 
 @router.get("/{user_id}", response_model=schema.UserResponse)
 def read_user(user_id: int, db: Session = Depends(get_db)):
@@ -32,10 +36,11 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
     return db_user
 
 @router.get("/{user_id}/dashboard-summary")
+@query_budget(2)
 def get_student_dashboard_summary(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -47,7 +52,7 @@ def create_feedback(
     user_id: int,
     feedback: feedback_schema.FeedbackCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return feedback_crud.create_feedback(user_id, feedback, db)
 
@@ -55,6 +60,6 @@ def create_feedback(
 def get_course_recommendation(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     return course_crud.get_course_recommendations(user_id, db)
\ No newline at end of file
@@ -1,6 +1,11 @@
+from datetime import datetime
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from app.config import settings
 from app.database import SessionLocal
-from app.routers.attendance import mark_absent_for_expired_sessions
+from app.crud.attendance import mark_absent_for_expired_sessions
+from app.helpers.counters import flush_counter_deltas, reconcile_counters
+from app.helpers.user_search import refresh_user_search_index
 
 def start_scheduler():
     scheduler = BackgroundScheduler()
@@ -8,10 +13,44 @@ def start_scheduler():
     def job():
         print("🔄 Running daily attendance auto-mark task...")
         db = SessionLocal()
-        mark_absent_for_expired_sessions(db=db, current_user=None)
-        db.close()
+        try:
+            result = mark_absent_for_expired_sessions(db=db)
+            print(f"✅ Marked {result['inserted']} absences across {result['sessions_processed']} sessions "
+                  f"in {result['elapsed_ms']} ms")
+        finally:
+            db.close()
+
+    def reconcile_job():
+        db = SessionLocal()
+        try:
+            values = reconcile_counters(db)
+            print(f"✅ Reconciled admin overview counters: {values}")
+        finally:
+            db.close()
+
+    def flush_counters_job():
+        db = SessionLocal()
+        try:
+            flush_counter_deltas(db)
+        except Exception as e:
+            print(f"⚠️ Failed to flush admin overview counters, retrying next run: {e}")
+        finally:
+            db.close()
+
+    def user_search_job():
+        db = SessionLocal()
+        try:
+            refresh_user_search_index(db)
+        finally:
+            db.close()
 
     # Schedule to run once every 24 hours
     scheduler.add_job(job, 'interval', hours=24)
+    # Recount the admin overview counters at startup and then periodically
+    scheduler.add_job(reconcile_job, 'interval', minutes=settings.stats_reconcile_minutes, next_run_time=datetime.now())
+    # Write this process's committed counter changes
+    scheduler.add_job(flush_counters_job, 'interval', seconds=settings.stats_flush_seconds)
+    # Build the in-memory user search index at startup and rebuild it off the request path
+    scheduler.add_job(user_search_job, 'interval', seconds=settings.user_search_refresh_seconds, next_run_time=datetime.now())
 
     scheduler.start()
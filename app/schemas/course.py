@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 from app.schemas.lesson import SimpleLessonResponse
@@ -38,7 +40,7 @@ class CourseAdminResponse(BaseModel):
     id: int
     title: str
     description: str
-    creator: CreatorInCourse
+    creator: Optional[CreatorInCourse] = None
     total_students: int
     lesson_count: int
     avg_completion_rate: float
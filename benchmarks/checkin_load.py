@@ -0,0 +1,100 @@
+# Check-in load test: a lecture's worth of students checking in to one session at the same moment.
+#
+#   python -m benchmarks.checkin_load --base-url http://localhost:8000 --students 1000 --p99-ms 500
+#
+# Students, their enrollment and an open session are seeded straight into DATABASE_URL (use a scratch
+# database; the rows are not removed), tokens are minted locally, and every check-in is sent at once.
+# A second wave repeats each check-in to time the "already checked in" path. Exits non-zero when the
+# first wave is not all 200s, the second not all 400s, or p99 exceeds --p99-ms.
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import insert
+
+from app.auth import create_access_token
+from app.database import engine
+from app.models.course import Course
+from app.models.student_attendance import AttendanceSession
+from app.models.user import User
+from app.models.user_course import UserCourse
+from benchmarks.datagen import STUDENT_ROLE_ID
+from benchmarks.http_load import Recorder, summarize
+from benchmarks.load_scenarios import check_in_all
+
+# Never used to log in: the tokens are minted directly
+PLACEHOLDER_PASSWORD = "!"
+
+
+def seed(students: int, open_minutes: int):
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    now = datetime.now()
+    with engine.begin() as conn:
+        course_id = conn.execute(
+            insert(Course.__table__).returning(Course.id),
+            {"title": f"Check-in load test {stamp}", "description": "benchmarks.checkin_load"}
+        ).scalar_one()
+
+        users = [
+            {"username": f"load_{stamp}_{i}", "email": f"load_{stamp}_{i}@example.com",
+             "password": PLACEHOLDER_PASSWORD, "role_id": STUDENT_ROLE_ID}
+            for i in range(students)
+        ]
+        user_ids = list(conn.execute(
+            insert(User.__table__).returning(User.id, sort_by_parameter_order=True), users
+        ).scalars())
+
+        conn.execute(insert(UserCourse.__table__), [{"user_id": u, "course_id": course_id} for u in user_ids])
+        session_id = conn.execute(
+            insert(AttendanceSession.__table__).returning(AttendanceSession.id),
+            {"course_id": course_id, "start_time": now - timedelta(minutes=1),
+             "end_time": now + timedelta(minutes=open_minutes), "type": "manual"}
+        ).scalar_one()
+
+    tokens = [
+        create_access_token({"sub": user["username"], "user_id": user_id, "role_id": STUDENT_ROLE_ID},
+                            timedelta(minutes=open_minutes))
+        for user, user_id in zip(users, user_ids)
+    ]
+    return session_id, tokens
+
+async def wave(client: httpx.AsyncClient, session_id: int, tokens):
+    recorder = Recorder(client)
+    started = time.perf_counter()
+    await check_in_all(recorder, session_id, tokens)
+    return summarize(recorder.samples, time.perf_counter() - started)
+
+async def run(args) -> bool:
+    session_id, tokens = seed(args.students, args.open_minutes)
+    print(f"Seeded session {session_id} with {len(tokens)} students")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        first = await wave(client, session_id, tokens)
+        print("check-in:      ", first)
+        second = await wave(client, session_id, tokens)
+        print("duplicate:     ", second)
+
+    ok = first["statuses"] == {"200": len(tokens)} and second["statuses"] == {"400": len(tokens)}
+    if args.p99_ms is not None:
+        ok = ok and first["p99_ms"] <= args.p99_ms and second["p99_ms"] <= args.p99_ms
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent attendance check-in load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1000, help="maximum open connections")
+    parser.add_argument("--open-minutes", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--p99-ms", type=float, default=None, help="fail when p99 latency exceeds this")
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
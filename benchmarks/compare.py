@@ -0,0 +1,72 @@
+# Compare two benchmarks.crud_bench result files, e.g. the base branch against a change:
+#
+#   python -m benchmarks.compare results/base.json results/head.json --threshold 20
+#
+# Prints median time, statement count and peak memory per case with the relative change, and exits
+# non-zero when a case got slower than --threshold percent (and --min-ms in absolute terms, so
+# sub-millisecond noise is ignored) or issues more statements than before.
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+def compare(base: dict, head: dict, threshold: float, min_ms: float):
+    regressions = []
+    rows = []
+    for name, after in head["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            rows.append(f"{name:48} {'new':>21}  {after['median_ms']:9.3f} ms")
+            continue
+
+        slower = after["median_ms"] - before["median_ms"]
+        flags = []
+        if slower > min_ms and slower > before["median_ms"] * threshold / 100:
+            flags.append("slower")
+        if after["queries"] > before["queries"]:
+            flags.append("more queries")
+        if flags:
+            regressions.append(f"{name}: {', '.join(flags)}")
+
+        rows.append(
+            f"{name:48} {before['median_ms']:9.3f} -> {after['median_ms']:9.3f} ms {_change(before['median_ms'], after['median_ms'])}"
+            f"  queries {before['queries']:3} -> {after['queries']:3}"
+            f"  peak {before['peak_kib']:9.1f} -> {after['peak_kib']:9.1f} KiB {_change(before['peak_kib'], after['peak_kib'])}"
+            + (f"  <- {', '.join(flags)}" if flags else "")
+        )
+    for name in base["results"].keys() - head["results"].keys():
+        rows.append(f"{name:48} {'removed':>21}")
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two CRUD benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=20, help="allowed median slowdown in percent")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    base, head = _load(args.base), _load(args.head)
+    for key in ("dialect", "scale", "seed"):
+        if base["meta"].get(key) != head["meta"].get(key):
+            print(f"warning: {key} differs ({base['meta'].get(key)} vs {head['meta'].get(key)}), results are not comparable")
+    print(f"base {base['meta'].get('revision')}  head {head['meta'].get('revision')}  ({head['meta'].get('dialect')})")
+
+    rows, regressions = compare(base, head, args.threshold, args.min_ms)
+    print("\n".join(rows))
+    if regressions:
+        print(f"\n{len(regressions)} regressions:\n  " + "\n  ".join(regressions))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
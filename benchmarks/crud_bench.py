@@ -0,0 +1,246 @@
+# CRUD micro-benchmarks: times app/crud functions against a benchmarks.datagen dataset and writes JSON results
+# that benchmarks.compare can diff between commits.
+#
+#   DATABASE_URL=sqlite:///bench.db python -m benchmarks.crud_bench --scale 1 --output results/sqlite.json
+#   DATABASE_URL=postgresql://localhost/bench python -m benchmarks.crud_bench --scale 1 --output results/pg.json
+#
+# DATABASE_URL must point to a scratch database migrated to head: the dataset is inserted and the write
+# benchmarks commit. Each case runs one untimed warm-up, then --iterations timed calls, each after its own
+# untimed setup. The statement count comes from the first timed call, and peak Python memory from one
+# extra call under tracemalloc, so tracing does not skew the timings.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, event, text
+from starlette.responses import StreamingResponse
+
+from app.crud import admin as admin_crud
+from app.crud import attendance as attendance_crud
+from app.crud import course as course_crud
+from app.crud import lesson as lesson_crud
+from app.crud import quiz as quiz_crud
+from app.crud import user as user_crud
+from app.database import SessionLocal, engine
+from app.helpers.dashboard_cache import dashboard_cache
+from app.helpers.principals import Principal, RolePrincipal
+from app.helpers.quiz_cache import get_compiled_quiz, lesson_quiz_cache, quiz_cache
+from app.models.job_watermark import JobWatermark
+from app.schemas.attendance import AttendanceBulkUpdate, AttendancePatch
+from app.schemas.quiz import AnswerSubmit, QuizSubmitRequest
+from benchmarks import datagen
+from benchmarks.stats import percentile
+
+
+# setup(db) runs untimed before every call and returns the arguments passed to run(db, *args)
+@dataclass
+class Case:
+    name: str
+    run: Callable
+    setup: Optional[Callable] = None
+
+
+def _principal(user_id: int, role_id: int, role_name: str) -> Principal:
+    return Principal(id=user_id, username=f"user{user_id}", role_id=role_id, role=RolePrincipal(id=role_id, name=role_name))
+
+# Streaming exports only do their work when the body is consumed
+def _drain(response):
+    if not isinstance(response, StreamingResponse):
+        return response
+
+    async def consume():
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        return size
+    return asyncio.run(consume())
+
+def cases(data: datagen.Dataset) -> List[Case]:
+    student_id, course_id, lesson_id, quiz_id, teacher_id = data.sample()
+    student = _principal(student_id, datagen.STUDENT_ROLE_ID, "student")
+    teacher = _principal(teacher_id, datagen.TEACHER_ROLE_ID, "teacher")
+    members = data.members(course_id)
+    open_session_id = data.open_sessions[course_id]
+
+    # Writes that can only happen once per student take the next unused one on every call
+    submitters = iter([s for s in data.student_ids if data.enrollments[s]])
+    checkins = iter(members)
+    present = count()
+
+    def cold_quiz_caches(db):
+        quiz_cache.clear()
+        lesson_quiz_cache.clear()
+        return ()
+
+    def cold_dashboard(db):
+        dashboard_cache.clear()
+        return ()
+
+    def next_submission(db):
+        submitter = next(submitters)
+        # The last lesson of a course is never the sample's, and datagen leaves at most two attempts on it
+        quiz = get_compiled_quiz(db, data.quiz_by_lesson[data.lessons_by_course[data.enrollments[submitter][0]][-1]])
+        answers = [AnswerSubmit(question_id=q.id, selected=q.correct_answer) for q in quiz.questions]
+        return QuizSubmitRequest(quiz_id=quiz.id, answers=answers), submitter
+
+    def next_bulk_update(db):
+        flag = next(present) % 2 == 0
+        updates = [AttendancePatch(user_id=member, present=flag) for member in members]
+        return (AttendanceBulkUpdate(session_id=open_session_id, updates=updates),)
+
+    def reset_absence_watermark(db):
+        # Every call then walks all ended sessions again; their records already exist, so nothing is inserted
+        db.execute(delete(JobWatermark).where(JobWatermark.name == attendance_crud.ABSENCE_JOB_NAME))
+        db.commit()
+        return ()
+
+    return [
+        Case("user.get_student_dashboard_summary", lambda db: user_crud.get_student_dashboard_summary(student_id, db),
+             setup=cold_dashboard),
+        Case("course.get_courses_by_user", lambda db: course_crud.get_courses_by_user(student_id, db)),
+        Case("course.get_users_by_course", lambda db: course_crud.get_users_by_course(course_id, db, teacher_id)),
+        Case("lesson.get_lessons_with_progress", lambda db: lesson_crud.get_lessons_with_progress(course_id, db, student)),
+        Case("quiz.get_quiz_by_lesson", lambda db: quiz_crud.get_quiz_by_lesson(lesson_id, student_id, db),
+             setup=cold_quiz_caches),
+        Case("quiz.get_quiz_results", lambda db: quiz_crud.get_quiz_results(quiz_id, db)),
+        Case("quiz.submit_quiz", lambda db, submission, user: quiz_crud.submit_quiz(submission, user, db),
+             setup=next_submission),
+        Case("quiz.export_quiz_results_csv", lambda db: _drain(quiz_crud.export_quiz_results_csv(quiz_id, db))),
+        Case("attendance.mark_attendance", lambda db, user: attendance_crud.mark_attendance(user, open_session_id, db),
+             setup=lambda db: (next(checkins),)),
+        Case("attendance.bulk_update_attendance",
+             lambda db, update: attendance_crud.bulk_update_attendance(update, teacher, db), setup=next_bulk_update),
+        Case("attendance.mark_absent_for_expired_sessions", attendance_crud.mark_absent_for_expired_sessions,
+             setup=reset_absence_watermark),
+        Case("attendance.export_course_attendance_csv",
+             lambda db: _drain(attendance_crud.export_course_attendance_csv(course_id, db, teacher))),
+        Case("admin.get_all_courses_with_stats", lambda db: admin_crud.get_all_courses_with_stats(db)),
+        Case("admin.get_admin_dashboard_data(fresh)", lambda db: admin_crud.get_admin_dashboard_data(db, fresh=True)),
+        # Every email contains the term: the most candidates to rank
+        Case("admin.get_all_users(search)", lambda db: admin_crud.get_all_users(db, search="example.com")),
+    ]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+def _call(case: Case, counter: Optional[StatementCounter] = None) -> float:
+    db = SessionLocal()
+    try:
+        args = case.setup(db) if case.setup else ()
+        if counter is not None:
+            event.listen(engine, "before_cursor_execute", counter)
+        try:
+            started = time.perf_counter()
+            case.run(db, *args)
+            return (time.perf_counter() - started) * 1000
+        finally:
+            if counter is not None:
+                event.remove(engine, "before_cursor_execute", counter)
+    finally:
+        db.rollback()
+        db.close()
+
+def _peak_kib(case: Case) -> float:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        _call(case)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def measure(case: Case, iterations: int) -> Dict:
+    _call(case)
+
+    counter = StatementCounter()
+    timings = [_call(case, counter)]
+    timings += [_call(case) for _ in range(iterations - 1)]
+    timings.sort()
+
+    return {
+        "iterations": len(timings),
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "queries": counter.count,
+        "peak_kib": _peak_kib(case),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Time app/crud functions against a synthetic dataset")
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset size, 1 = 5000 students")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", action="append", default=[], help="run only cases whose name contains this")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    args = parser.parse_args()
+
+    data = datagen.seed(engine, scale=args.scale, seed=args.seed)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print("Seeded", data.row_counts)
+
+    # Check-ins use a new student on each call: the warm-up, the timed calls and the tracemalloc call
+    members = len(data.members(data.sample()[1]))
+    iterations = min(args.iterations, members - 2)
+    if iterations < args.iterations:
+        print(f"Capping iterations at {iterations}: the sample course has {members} students to check in")
+
+    results = {}
+    for case in cases(data):
+        if args.only and not any(part in case.name for part in args.only):
+            continue
+        results[case.name] = measure(case, iterations)
+        r = results[case.name]
+        print(f"{case.name:48} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  "
+              f"{r['queries']:3} queries  peak {r['peak_kib']:9.1f} KiB")
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "dialect": engine.dialect.name,
+            "server_version": ".".join(map(str, engine.dialect.server_version_info or ())),
+            "python": platform.python_version(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "iterations": iterations,
+            "row_counts": data.row_counts,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
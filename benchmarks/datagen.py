@@ -0,0 +1,230 @@
+# Synthetic dataset shared by the benchmarks: roles, admins, teachers and students, courses with lessons and quizzes,
+# enrollments, lesson progress, quiz attempts, attendance sessions with their records, and system logs.
+#
+# Rows go straight into the given engine with batched Core inserts (use a scratch database; nothing is
+# removed afterwards). Names carry a per-run stamp so repeated runs do not collide, and the same
+# --seed produces the same shape of data.
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import inspect, insert, select
+from sqlalchemy.engine import Engine
+
+from app.models.course import Course
+from app.models.lesson import Lesson
+from app.models.quiz_models import LessonQuiz, QuizQuestion, StudentQuizResult
+from app.models.role import Role
+from app.models.student_attendance import AttendanceSession, StudentAttendance
+from app.models.system_log import SystemLog
+from app.models.user import User
+from app.models.user_course import UserCourse
+from app.models.user_lesson_progress import UserLessonProgress
+
+TEACHER_ROLE_ID = 1
+STUDENT_ROLE_ID = 2
+ADMIN_ROLE_ID = 3
+# Same rows as migration V2
+ROLES = {1: "teacher", 2: "student", 3: "admin"}
+# Matches no password: benchmark tokens are minted directly unless seed() is given a real hash
+PLACEHOLDER_PASSWORD = "!"
+BATCH_SIZE = 5000
+CHOICES = ["a", "b", "c", "d"]
+
+
+# Row counts at --scale 1; everything except the per-course shape grows linearly with scale
+@dataclass
+class DatasetShape:
+    admins: int = 2
+    teachers: int = 20
+    students: int = 5000
+    courses: int = 50
+    lessons_per_course: int = 10
+    questions_per_quiz: int = 5
+    courses_per_student: int = 5
+    attempts_per_enrollment: int = 2
+    sessions_per_course: int = 8
+    system_logs: int = 50000
+
+    def scaled(self, scale: float) -> "DatasetShape":
+        def grow(value):
+            return max(int(value * scale), 1)
+        return DatasetShape(
+            admins=self.admins,
+            teachers=grow(self.teachers),
+            students=grow(self.students),
+            courses=grow(self.courses),
+            lessons_per_course=self.lessons_per_course,
+            questions_per_quiz=self.questions_per_quiz,
+            courses_per_student=min(self.courses_per_student, grow(self.courses)),
+            attempts_per_enrollment=self.attempts_per_enrollment,
+            sessions_per_course=self.sessions_per_course,
+            system_logs=grow(self.system_logs),
+        )
+
+
+@dataclass
+class Dataset:
+    admin_ids: List[int]
+    teacher_ids: List[int]
+    student_ids: List[int]
+    course_ids: List[int]
+    # Course id -> its lesson ids, lesson id -> its quiz id
+    lessons_by_course: Dict[int, List[int]]
+    quiz_by_lesson: Dict[int, int]
+    # Course id -> creator, student id -> enrolled course ids
+    course_creators: Dict[int, int]
+    enrollments: Dict[int, List[int]]
+    session_ids: List[int]
+    # Course id -> its session that is open now (no attendance records yet)
+    open_sessions: Dict[int, int]
+    # User id -> username, the subject of an access token
+    usernames: Dict[int, str]
+    row_counts: Dict[str, int] = field(default_factory=dict)
+
+    # A student with enrollments, one of their courses with its first lesson and quiz, and its teacher
+    def sample(self):
+        student_id = next(s for s in self.student_ids if self.enrollments[s])
+        course_id = self.enrollments[student_id][0]
+        lesson_id = self.lessons_by_course[course_id][0]
+        return student_id, course_id, lesson_id, self.quiz_by_lesson[lesson_id], self.course_creators[course_id]
+
+    def members(self, course_id: int) -> List[int]:
+        return [student_id for student_id, courses in self.enrollments.items() if course_id in courses]
+
+
+def _insert(conn, model, rows) -> int:
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(model.__table__), rows[start:start + BATCH_SIZE])
+    return len(rows)
+
+def _insert_returning_ids(conn, model, rows) -> List[int]:
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        ids.extend(conn.execute(
+            insert(model.__table__).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + BATCH_SIZE]
+        ).scalars())
+    return ids
+
+def seed(engine: Engine, scale: float = 1.0, seed: int = 0, password_hash: str = PLACEHOLDER_PASSWORD) -> Dataset:
+    shape = DatasetShape().scaled(scale)
+    rng = random.Random(seed)
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    now = datetime.now()
+    counts = {}
+    usernames = {}
+
+    with engine.begin() as conn:
+        existing_roles = set(conn.execute(select(Role.id)).scalars())
+        _insert(conn, Role, [{"id": role_id, "name": name} for role_id, name in ROLES.items() if role_id not in existing_roles])
+
+        def users(prefix, count, role_id):
+            rows = [
+                {"username": f"{prefix}_{stamp}_{i}", "email": f"{prefix}_{stamp}_{i}@example.com",
+                 "password": password_hash, "role_id": role_id}
+                for i in range(count)
+            ]
+            ids = _insert_returning_ids(conn, User, rows)
+            usernames.update((user_id, row["username"]) for user_id, row in zip(ids, rows))
+            return ids
+
+        admin_ids = users("admin", shape.admins, ADMIN_ROLE_ID)
+        teacher_ids = users("teacher", shape.teachers, TEACHER_ROLE_ID)
+        student_ids = users("student", shape.students, STUDENT_ROLE_ID)
+        counts["users"] = len(usernames)
+
+        course_rows = [
+            {"title": f"Course {stamp} {i}", "description": "benchmarks.datagen", "creator_id": rng.choice(teacher_ids)}
+            for i in range(shape.courses)
+        ]
+        course_ids = _insert_returning_ids(conn, Course, course_rows)
+        course_creators = {course_id: row["creator_id"] for course_id, row in zip(course_ids, course_rows)}
+        counts["courses"] = len(course_ids)
+
+        lesson_rows = [
+            {"title": f"Lesson {n}", "content": "", "course_id": course_id}
+            for course_id in course_ids for n in range(shape.lessons_per_course)
+        ]
+        lesson_ids = _insert_returning_ids(conn, Lesson, lesson_rows)
+        lessons_by_course = {course_id: [] for course_id in course_ids}
+        for lesson_id, row in zip(lesson_ids, lesson_rows):
+            lessons_by_course[row["course_id"]].append(lesson_id)
+        counts["lessons"] = len(lesson_ids)
+
+        quiz_ids = _insert_returning_ids(conn, LessonQuiz, [
+            {"lesson_id": lesson_id, "title": f"Quiz {lesson_id}", "max_attempts": 3, "passing_score": 70}
+            for lesson_id in lesson_ids
+        ])
+        quiz_by_lesson = dict(zip(lesson_ids, quiz_ids))
+        counts["lesson_quizzes"] = len(quiz_ids)
+        counts["quiz_questions"] = _insert(conn, QuizQuestion, [
+            {"quiz_id": quiz_id, "question": f"Question {n}", "choices": CHOICES, "correct_answer": CHOICES[0]}
+            for quiz_id in quiz_ids for n in range(shape.questions_per_quiz)
+        ])
+
+        enrollments = {s: rng.sample(course_ids, shape.courses_per_student) for s in student_ids}
+        counts["user_course"] = _insert(conn, UserCourse, [
+            {"user_id": s, "course_id": c, "is_completed": False} for s, courses in enrollments.items() for c in courses
+        ])
+
+        progress, results = [], []
+        for student_id, courses in enrollments.items():
+            for course_id in courses:
+                lessons = lessons_by_course[course_id]
+                for lesson_id in lessons[:rng.randint(0, len(lessons))]:
+                    progress.append({"user_id": student_id, "lesson_id": lesson_id, "is_completed": rng.random() < 0.7})
+                for _ in range(shape.attempts_per_enrollment):
+                    results.append({
+                        "user_id": student_id, "quiz_id": quiz_by_lesson[rng.choice(lessons)],
+                        "selected_answers": {}, "score": rng.randint(0, 100),
+                        "submitted_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                    })
+        counts["user_lesson_progress"] = _insert(conn, UserLessonProgress, progress)
+        counts["student_quiz_results"] = _insert(conn, StudentQuizResult, results)
+
+        # Past sessions one day apart, and the latest one per course still open
+        session_rows = [
+            {"course_id": course_id, "lesson_id": lessons_by_course[course_id][n % shape.lessons_per_course],
+             "start_time": now - timedelta(days=n, hours=1), "end_time": now - timedelta(days=n) + timedelta(minutes=30),
+             "type": "manual"}
+            for course_id in course_ids for n in range(shape.sessions_per_course)
+        ]
+        session_ids = _insert_returning_ids(conn, AttendanceSession, session_rows)
+        open_sessions = {row["course_id"]: session_id for session_id, row in zip(session_ids, session_rows) if row["end_time"] > now}
+        counts["attendance_sessions"] = len(session_ids)
+
+        members = {course_id: [] for course_id in course_ids}
+        for student_id, courses in enrollments.items():
+            for course_id in courses:
+                members[course_id].append(student_id)
+        counts["student_attendances"] = _insert(conn, StudentAttendance, [
+            {"user_id": student_id, "attendance_session_id": session_id,
+             "status": "present" if rng.random() < 0.8 else "absent", "check_in_time": row["start_time"]}
+            for session_id, row in zip(session_ids, session_rows) if row["end_time"] < now
+            for student_id in members[row["course_id"]]
+        ])
+
+        # system_logs is not created by the migrations, so it is only filled where it exists
+        if inspect(conn).has_table(SystemLog.__tablename__):
+            counts["system_logs"] = _insert(conn, SystemLog, [
+                {"user_id": rng.choice(student_ids), "action": "quiz_submitted", "detail": "benchmarks.datagen",
+                 "timestamp": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600))}
+                for _ in range(shape.system_logs)
+            ])
+
+    return Dataset(
+        admin_ids=admin_ids,
+        teacher_ids=teacher_ids,
+        student_ids=student_ids,
+        course_ids=course_ids,
+        lessons_by_course=lessons_by_course,
+        quiz_by_lesson=quiz_by_lesson,
+        course_creators=course_creators,
+        enrollments=enrollments,
+        session_ids=session_ids,
+        open_sessions=open_sessions,
+        usernames=usernames,
+        row_counts=counts,
+    )
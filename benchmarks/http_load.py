@@ -0,0 +1,61 @@
+# Request recording and latency summaries shared by the HTTP load scripts (load_scenarios, checkin_load)
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+import httpx
+
+from benchmarks.stats import percentile
+
+
+class Recorder:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        # (endpoint, status or exception name, milliseconds)
+        self.samples = []
+
+    async def request(self, endpoint: str, method: str, url: str, token: Optional[str] = None, **kwargs):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.samples.append((endpoint, status, (time.perf_counter() - started) * 1000))
+        return response
+
+
+def _is_error(status) -> bool:
+    return not isinstance(status, int) or status >= 400
+
+def summarize(samples, elapsed: float) -> Dict:
+    latencies = sorted(ms for _, _, ms in samples)
+    statuses = Counter(status for _, status, _ in samples)
+    errors = sum(n for status, n in statuses.items() if _is_error(status))
+    return {
+        "requests": len(samples),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "statuses": {str(status): n for status, n in sorted(statuses.items(), key=str)},
+    }
+
+# Overall and per-endpoint summaries of a recorder's samples
+def summarize_by_endpoint(samples, elapsed: float) -> Dict:
+    endpoints = {}
+    for endpoint, status, ms in samples:
+        endpoints.setdefault(endpoint, []).append((endpoint, status, ms))
+    return {
+        "total": summarize(samples, elapsed),
+        "endpoints": {endpoint: summarize(group, elapsed) for endpoint, group in endpoints.items()},
+    }
+
+def print_summary(name: str, result: Dict):
+    for label, r in [(name, result["total"])] + [(f"  {e}", r) for e, r in result["endpoints"].items()]:
+        print(f"{label:48} {r['requests']:6} req  {r['throughput_rps'] or 0:8.1f} req/s  p50 {r['p50_ms']:8.1f}  "
+              f"p95 {r['p95_ms']:8.1f}  p99 {r['p99_ms']:8.1f} ms  errors {r['error_rate']:.2%}  {r['statuses']}")
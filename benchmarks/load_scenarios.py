@@ -0,0 +1,219 @@
+# End-to-end load scenarios: classroom traffic shapes sent over HTTP to a running server.
+#
+#   DATABASE_URL=postgresql://localhost/scratch python -m benchmarks.load_scenarios --serve --scale 0.2
+#   python -m benchmarks.load_scenarios --base-url http://localhost:8000 --scenario lecture --users 500
+#
+# A benchmarks.datagen dataset is seeded into DATABASE_URL (use a scratch database migrated to head); the server
+# must use the same database. --serve starts uvicorn on the --base-url port for the run and stops it afterwards.
+# Tokens are minted locally, except in morning-login, which posts the seeded password to /login.
+#
+#   lecture          every student of one course checks in to its open session at the same moment
+#   quiz-deadline    every student of one course submits the course's last quiz at the same moment
+#   morning-login    students log in, then load their dashboard summary with the token they got back
+#   admin-reporting  admins page through /admin/courses, load the overview and download CSV exports
+#
+# Each scenario reports throughput, p50/p95/p99 latency and error rate (non-2xx or no response), overall and per
+# endpoint. The exit code is non-zero when a scenario's error rate exceeds --max-error-rate or its p99 --p99-ms.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import select, text
+
+from app.auth import create_access_token
+from app.database import engine
+from app.models.quiz_models import QuizQuestion
+from app.utils import hash_password
+from benchmarks import datagen
+from benchmarks.http_load import Recorder, print_summary, summarize_by_endpoint
+
+# Every seeded user gets this password so the login scenario goes through bcrypt like a real login
+LOAD_PASSWORD = "load-scenarios"
+TOKEN_LIFETIME = timedelta(hours=1)
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _token(data: datagen.Dataset, user_id: int, role_id: int) -> str:
+    return create_access_token({"sub": data.usernames[user_id], "user_id": user_id, "role_id": role_id}, TOKEN_LIFETIME)
+
+def _largest_course(data: datagen.Dataset) -> int:
+    sizes = Counter(course_id for courses in data.enrollments.values() for course_id in courses)
+    return max(data.course_ids, key=lambda course_id: sizes[course_id])
+
+# Every token checks in to the session at the same moment
+async def check_in_all(recorder: Recorder, session_id: int, tokens: List[str]):
+    await asyncio.gather(*(
+        recorder.request("POST /attendances/check-in/{session_id}", "POST", f"/attendances/check-in/{session_id}", token)
+        for token in tokens
+    ))
+
+async def lecture(recorder: Recorder, data: datagen.Dataset, args):
+    course_id = _largest_course(data)
+    tokens = [_token(data, s, datagen.STUDENT_ROLE_ID) for s in data.members(course_id)[:args.users]]
+    await check_in_all(recorder, data.open_sessions[course_id], tokens)
+
+async def quiz_deadline(recorder: Recorder, data: datagen.Dataset, args):
+    course_id = _largest_course(data)
+    # datagen leaves at most two of the three allowed attempts on any quiz
+    quiz_id = data.quiz_by_lesson[data.lessons_by_course[course_id][-1]]
+    with engine.connect() as conn:
+        question_ids = list(conn.execute(select(QuizQuestion.id).where(QuizQuestion.quiz_id == quiz_id)).scalars())
+
+    rng = random.Random(args.seed)
+    submissions = [
+        (_token(data, s, datagen.STUDENT_ROLE_ID),
+         {"quiz_id": quiz_id, "answers": [{"question_id": q, "selected": rng.choice(datagen.CHOICES)} for q in question_ids]})
+        for s in data.members(course_id)[:args.users]
+    ]
+    await asyncio.gather(*(
+        recorder.request("POST /quizzes/submit", "POST", "/quizzes/submit", token, json=body)
+        for token, body in submissions
+    ))
+
+async def morning_login(recorder: Recorder, data: datagen.Dataset, args):
+    async def arrive(student_id):
+        response = await recorder.request("POST /login", "POST", "/login",
+                                          data={"username": data.usernames[student_id], "password": LOAD_PASSWORD})
+        if response is None or response.status_code != 200:
+            return
+        await recorder.request("GET /users/{user_id}/dashboard-summary", "GET", f"/users/{student_id}/dashboard-summary",
+                               response.json()["access_token"])
+
+    await asyncio.gather(*(arrive(s) for s in data.student_ids[:args.users]))
+
+async def admin_reporting(recorder: Recorder, data: datagen.Dataset, args):
+    async def report(n):
+        token = _token(data, data.admin_ids[n % len(data.admin_ids)], datagen.ADMIN_ROLE_ID)
+        course_id = data.course_ids[n % len(data.course_ids)]
+        cursor = None
+        while True:
+            response = await recorder.request("GET /admin/courses", "GET", "/admin/courses", token,
+                                              params={"cursor": cursor} if cursor else {})
+            if response is None or response.status_code != 200:
+                break
+            cursor = response.json()["next_cursor"]
+            if not cursor:
+                break
+        await recorder.request("GET /admin/overview", "GET", "/admin/overview", token)
+        await recorder.request("GET /attendances/export/course/{course_id}", "GET",
+                               f"/attendances/export/course/{course_id}", token)
+        quiz_id = data.quiz_by_lesson[data.lessons_by_course[course_id][0]]
+        await recorder.request("GET /quizzes/{quiz_id}/results/export", "GET", f"/quizzes/{quiz_id}/results/export", token)
+
+    await asyncio.gather(*(report(n) for n in range(args.admins)))
+
+SCENARIOS = {
+    "lecture": lecture,
+    "quiz-deadline": quiz_deadline,
+    "morning-login": morning_login,
+    "admin-reporting": admin_reporting,
+}
+
+
+async def run_scenario(scenario, data: datagen.Dataset, args) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        recorder = Recorder(client)
+        started = time.perf_counter()
+        await scenario(recorder, data, args)
+        elapsed = time.perf_counter() - started
+    return summarize_by_endpoint(recorder.samples, elapsed)
+
+
+@contextmanager
+def served(base_url: str, workers: int, timeout: float):
+    url = httpx.URL(base_url)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", url.host, "--port", str(url.port or 80),
+         "--workers", str(workers)],
+        cwd=PACKAGE_DIR
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"The server exited with code {process.returncode} before it was ready")
+            try:
+                if httpx.get(f"{base_url}/openapi.json", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"The server did not answer on {base_url} within {timeout:.0f}s")
+            time.sleep(0.2)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Classroom traffic scenarios against a running server")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--serve", action="store_true", help="start uvicorn on the --base-url port for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --serve")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), default=[],
+                        help="run only this scenario (repeatable); all of them by default")
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset size, 1 = 5000 students")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int, default=500, help="students per student scenario")
+    parser.add_argument("--admins", type=int, default=20, help="concurrent admin reports")
+    parser.add_argument("--concurrency", type=int, default=500, help="maximum open connections")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="fail when a scenario's error rate exceeds this")
+    parser.add_argument("--p99-ms", type=float, default=None, help="fail when a scenario's p99 latency exceeds this")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    args = parser.parse_args()
+
+    data = datagen.seed(engine, scale=args.scale, seed=args.seed, password_hash=hash_password(LOAD_PASSWORD))
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print("Seeded", data.row_counts)
+
+    results = {}
+    with served(args.base_url, args.workers, args.timeout) if args.serve else nullcontext():
+        for name in args.scenario or SCENARIOS:
+            results[name] = asyncio.run(run_scenario(SCENARIOS[name], data, args))
+            print_summary(name, results[name])
+
+    failures = [
+        name for name, result in results.items()
+        if result["total"]["error_rate"] > args.max_error_rate
+        or (args.p99_ms is not None and result["total"]["p99_ms"] > args.p99_ms)
+    ]
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {
+                    "base_url": args.base_url,
+                    "dialect": engine.dialect.name,
+                    "scale": args.scale,
+                    "seed": args.seed,
+                    "users": args.users,
+                    "admins": args.admins,
+                    "concurrency": args.concurrency,
+                    "row_counts": data.row_counts,
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                },
+                "scenarios": results,
+            }, f, indent=2)
+        print("Wrote", args.output)
+    if failures:
+        print("Over the error or latency budget:", ", ".join(failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
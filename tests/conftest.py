@@ -0,0 +1,47 @@
+import os
+import pkgutil
+import tempfile
+from importlib import import_module
+
+# Settings are read when app.config is imported, so the suite's own database and modes are fixed here, first:
+# a scratch SQLite file, the threadpool sessions, and the query guard failing any request over its budget
+_database_dir = tempfile.mkdtemp(prefix="lms-tests-")
+DATABASE_PATH = os.path.join(_database_dir, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+os.environ["DATABASE_MODE"] = "sync"
+os.environ["QUERY_GUARD"] = "raise"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.models
+from app.auth import create_access_token
+from app.database import engine
+from app.models import Base
+from benchmarks import datagen
+
+# 500 students in 5 courses
+DATASET_SCALE = 0.1
+
+
+@pytest.fixture(scope="session")
+def data() -> datagen.Dataset:
+    for module in pkgutil.iter_modules(app.models.__path__):
+        import_module(f"app.models.{module.name}")
+    Base.metadata.create_all(engine)
+    dataset = datagen.seed(engine, scale=DATASET_SCALE, seed=0)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return dataset
+
+# Without the lifespan: no migrations, scheduler or audit writer thread
+@pytest.fixture(scope="session")
+def client(data) -> TestClient:
+    from app.main import app
+    return TestClient(app)
+
+
+def auth_headers(data: datagen.Dataset, user_id: int, role_id: int) -> dict:
+    token = create_access_token({"sub": data.usernames[user_id], "user_id": user_id, "role_id": role_id})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,50 @@
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.student_attendance import StudentAttendance
+from app.models.user import User
+from benchmarks import datagen
+from tests.conftest import auth_headers
+
+
+def _open_session_of_another_course(data: datagen.Dataset):
+    sampled_course_id = data.sample()[1]
+    course_id = next(c for c in data.course_ids if c != sampled_course_id)
+    return course_id, data.open_sessions[course_id]
+
+def _patch(client, data, course_id, session_id, user_ids):
+    return client.patch(
+        "/attendances/records",
+        json={"session_id": session_id, "updates": [{"user_id": user_id, "present": True} for user_id in user_ids]},
+        headers=auth_headers(data, data.course_creators[course_id], datagen.TEACHER_ROLE_ID),
+    )
+
+
+# The split comes from the write itself: new students are inserted, and the same request again only updates
+def test_bulk_update_reports_inserted_and_updated_rows(client, data):
+    course_id, session_id = _open_session_of_another_course(data)
+    user_ids = data.members(course_id)[:10]
+    with SessionLocal() as db:
+        existing = db.execute(
+            select(func.count()).select_from(StudentAttendance)
+            .where(StudentAttendance.attendance_session_id == session_id, StudentAttendance.user_id.in_(user_ids))
+        ).scalar()
+
+    first = _patch(client, data, course_id, session_id, user_ids)
+    assert first.status_code == 200
+    assert (first.json()["inserted"], first.json()["updated"]) == (len(user_ids) - existing, existing)
+
+    again = _patch(client, data, course_id, session_id, user_ids)
+    assert (again.json()["inserted"], again.json()["updated"]) == (0, len(user_ids))
+
+def test_unknown_students_are_rejected_before_anything_is_written(client, data):
+    course_id, session_id = _open_session_of_another_course(data)
+    with SessionLocal() as db:
+        unknown_id = db.execute(select(func.max(User.id))).scalar() + 1
+        before = db.execute(select(func.count()).select_from(StudentAttendance)).scalar()
+
+    response = _patch(client, data, course_id, session_id, [data.members(course_id)[-1], unknown_id])
+    assert response.status_code == 400
+    assert str(unknown_id) in response.json()["detail"]
+    with SessionLocal() as db:
+        assert db.execute(select(func.count()).select_from(StudentAttendance)).scalar() == before
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.helpers.audit import AuditWriter
+
+
+@pytest.fixture
+def full_writer(tmp_path):
+    writer = AuditWriter(batch_size=10, flush_interval=1, max_queue=1, overflow="block",
+                         spill_path=str(tmp_path / "spill.jsonl"))
+    # Stands in for a writer thread that has fallen behind: alive, never draining the queue
+    release = threading.Event()
+    writer._thread = threading.Thread(target=release.wait, daemon=True)
+    writer._thread.start()
+    writer.submit({"action": "first"})
+    yield writer
+    release.set()
+
+
+def test_block_overflow_spills_on_the_event_loop(full_writer):
+    async def handler():
+        full_writer.submit({"action": "from async handler"})
+
+    asyncio.run(asyncio.wait_for(handler(), timeout=5))
+    assert full_writer.stats()["spilled"] == 1
+    with open(full_writer.spill_path) as f:
+        assert "from async handler" in f.read()
+
+def test_block_overflow_waits_in_a_worker_thread(full_writer):
+    worker = threading.Thread(target=full_writer.submit, args=({"action": "from threadpool"},))
+    worker.start()
+    worker.join(0.2)
+    assert worker.is_alive()
+
+    full_writer._queue.get_nowait()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert full_writer.stats()["spilled"] == 0
@@ -0,0 +1,76 @@
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.helpers import counters
+from app.helpers.counters import PendingDeltas, bump_counters, flush_counter_deltas, pending_deltas, reconcile_counters
+from app.models.course import Course
+from app.models.quiz_models import QuizQuestion
+from app.models.stat_counter import StatCounter
+from app.models.user_lesson_progress import UserLessonProgress
+from benchmarks import datagen
+from tests.conftest import auth_headers
+
+
+def _stored(db, name: str) -> int:
+    return db.execute(select(StatCounter.value).where(StatCounter.name == name)).scalar_one()
+
+def _untouched_lesson(db, data: datagen.Dataset):
+    for student_id in data.student_ids:
+        course_id = data.enrollments[student_id][0]
+        done = set(db.execute(select(UserLessonProgress.lesson_id).where(UserLessonProgress.user_id == student_id)).scalars())
+        for lesson_id in data.lessons_by_course[course_id]:
+            if lesson_id not in done:
+                return student_id, lesson_id
+
+
+# A submission only stages its counter changes; stat_counters is written by the periodic flush
+def test_quiz_submission_counters_reach_stat_counters_on_flush(client, data):
+    with SessionLocal() as db:
+        reconcile_counters(db)
+        before = _stored(db, counters.PROGRESS_ROWS)
+        student_id, lesson_id = _untouched_lesson(db, data)
+        quiz_id = data.quiz_by_lesson[lesson_id]
+        question_ids = db.execute(select(QuizQuestion.id).where(QuizQuestion.quiz_id == quiz_id)).scalars().all()
+
+    answers = [{"question_id": question_id, "selected": datagen.CHOICES[0]} for question_id in question_ids]
+    response = client.post("/quizzes/submit", json={"quiz_id": quiz_id, "answers": answers},
+                           headers=auth_headers(data, student_id, datagen.STUDENT_ROLE_ID))
+    assert response.status_code == 200
+
+    with SessionLocal() as db:
+        assert _stored(db, counters.PROGRESS_ROWS) == before
+        flush_counter_deltas(db)
+        assert _stored(db, counters.PROGRESS_ROWS) == before + 1
+
+def test_rolled_back_changes_are_not_counted(data):
+    pending_deltas.take()
+    with SessionLocal() as db:
+        bump_counters(db, **{counters.COURSES: 1})
+        db.execute(select(1))
+        db.rollback()
+    assert pending_deltas.take() == {}
+
+# Another worker's delta is committed but still unflushed while this one reconciles: the recount already includes
+# it, so the other worker's later flush must not add it a second time
+def test_delta_committed_before_a_reconcile_is_not_counted_twice(data, monkeypatch):
+    other_worker = PendingDeltas()
+    with SessionLocal() as db:
+        reconcile_counters(db)
+        monkeypatch.setattr(counters, "pending_deltas", other_worker)
+        course = Course(title="Counted once", description="", creator_id=data.course_creators[data.course_ids[0]])
+        db.add(course)
+        bump_counters(db, **{counters.COURSES: 1})
+        db.commit()
+        assert other_worker
+
+        try:
+            monkeypatch.setattr(counters, "pending_deltas", PendingDeltas())
+            values = reconcile_counters(db)
+            monkeypatch.setattr(counters, "pending_deltas", other_worker)
+            assert flush_counter_deltas(db) == {}
+            assert values[counters.COURSES] == counters._true_values(db)[counters.COURSES]
+            assert _stored(db, counters.COURSES) == values[counters.COURSES]
+        finally:
+            db.delete(course)
+            db.commit()
+            reconcile_counters(db)
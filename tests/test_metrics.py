@@ -0,0 +1,19 @@
+from app.config import settings
+from benchmarks import datagen
+from tests.conftest import auth_headers
+
+
+# Without METRICS_TOKEN only admins can read /metrics
+def test_metrics_require_an_admin(client, data):
+    assert client.get("/metrics").status_code == 401
+    student = auth_headers(data, data.student_ids[0], datagen.STUDENT_ROLE_ID)
+    assert client.get("/metrics", headers=student).status_code == 403
+
+    response = client.get("/metrics", headers=auth_headers(data, data.admin_ids[0], datagen.ADMIN_ROLE_ID))
+    assert response.status_code == 200
+    assert "db_pool_checkouts_total" in response.text
+
+def test_metrics_accept_the_scrape_token(client, data, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
@@ -0,0 +1,24 @@
+import asyncio
+import operator
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.helpers.password_pool import PasswordHasherPool
+
+
+# A worker exiting mid-call breaks the executor: the call fails with 503, is counted as failed rather than
+# completed, and the next call runs on a new executor
+def test_broken_pool_is_replaced_and_failures_are_not_completions():
+    pool = PasswordHasherPool(workers=1, queue_size=1, retry_after=1)
+    try:
+        with pytest.raises(HTTPException) as rejected:
+            asyncio.run(pool._run(os._exit, 1))
+        assert rejected.value.status_code == 503
+
+        assert asyncio.run(pool._run(operator.add, 2, 3)) == 5
+        stats = pool.stats()
+        assert (stats["completed"], stats["failed"], stats["in_flight"]) == (1, 1, 0)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+from app.database import engine
+from app.helpers.dashboard_cache import dashboard_cache
+from app.helpers.principals import principal_cache
+from benchmarks import datagen
+from tests.conftest import DATABASE_PATH, auth_headers
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _routes(data: datagen.Dataset):
+    student_id, course_id, lesson_id, _, _ = data.sample()
+    student = auth_headers(data, student_id, datagen.STUDENT_ROLE_ID)
+    admin = auth_headers(data, data.admin_ids[0], datagen.ADMIN_ROLE_ID)
+    return [
+        (f"/users/{student_id}/dashboard-summary", student),
+        (f"/courses/by-user/{student_id}", student),
+        ("/admin/courses", admin),
+        ("/attendances/available", student),
+        (f"/quizzes/by-lesson/{lesson_id}", student),
+    ]
+
+def _checkouts_of(client, url: str, headers: dict) -> int:
+    dashboard_cache.clear()
+    before = engine.pool.stats.checkouts
+    assert client.get(url, headers=headers).status_code == 200
+    return engine.pool.stats.checkouts - before
+
+
+# Authentication and the handler share the request's session, so a principal-cache miss costs no extra checkout
+def test_one_pool_checkout_per_authenticated_request(client, data):
+    for url, headers in _routes(data):
+        principal_cache.clear()
+        assert _checkouts_of(client, url, headers) == 1, url
+        assert _checkouts_of(client, url, headers) == 1, url
+
+
+# DATABASE_MODE=async gives the threadpool routers and the async routers different pools; settings are read at
+# import, so the app runs in a child process against the suite's database
+ASYNC_MODE_SCRIPT = """
+import json, sys
+from fastapi.testclient import TestClient
+from app.auth import create_access_token
+from app.database import async_engine, engine
+from app.main import app
+
+client = TestClient(app)
+results = {}
+for url, subject, user_id, role_id in json.loads(sys.argv[1]):
+    token = create_access_token({"sub": subject, "user_id": user_id, "role_id": role_id})
+    headers = {"Authorization": f"Bearer {token}"}
+    # The first request resolves the principal, the second finds it cached
+    for attempt in ("cold", "warm"):
+        before = engine.pool.stats.checkouts, async_engine.sync_engine.pool.stats.checkouts
+        assert client.get(url, headers=headers).status_code == 200
+        after = engine.pool.stats.checkouts, async_engine.sync_engine.pool.stats.checkouts
+        results[f"{attempt} {url}"] = {"sync": after[0] - before[0], "async": after[1] - before[1]}
+print(json.dumps(results))
+"""
+
+# Async routers share the request's AsyncSession with authentication; a threadpool router only reads the principal
+# through the async pool on a miss
+def test_async_mode_pool_checkouts(data):
+    # Different students, so neither request finds the other's principal cached
+    student_id, other_student_id = data.student_ids[:2]
+    requests = [
+        (f"/courses/by-user/{student_id}", data.usernames[student_id], student_id, datagen.STUDENT_ROLE_ID),
+        ("/attendances/available", data.usernames[other_student_id], other_student_id, datagen.STUDENT_ROLE_ID),
+    ]
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{DATABASE_PATH}", "DATABASE_MODE": "async",
+           "QUERY_GUARD": "off", "METRICS_ENABLED": "false"}
+    completed = subprocess.run([sys.executable, "-c", ASYNC_MODE_SCRIPT, json.dumps(requests)],
+                               cwd=PACKAGE_DIR, env=env, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+
+    results = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert results[f"cold /courses/by-user/{student_id}"] == {"sync": 1, "async": 1}
+    assert results[f"warm /courses/by-user/{student_id}"] == {"sync": 1, "async": 0}
+    assert results["cold /attendances/available"] == {"sync": 0, "async": 1}
+    assert results["warm /attendances/available"] == {"sync": 0, "async": 1}
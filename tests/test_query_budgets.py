@@ -0,0 +1,82 @@
+from functools import partial
+
+from sqlalchemy import func, select
+
+from app.crud import attendance as attendance_crud
+from app.crud import quiz as quiz_crud
+from app.database import SessionLocal
+from app.models.quiz_models import QuizQuestion, StudentQuizResult
+from app.models.student_attendance import AttendanceSession
+from benchmarks import datagen
+from tests.conftest import auth_headers
+
+
+# One request per route declaring a @query_budget; the suite runs with QUERY_GUARD=raise, so TestClient re-raises
+# QueryBudgetExceeded for a route over its budget or repeating a statement shape (N+1)
+def _budgeted_requests(data: datagen.Dataset):
+    student_id, course_id, lesson_id, quiz_id, teacher_id = data.sample()
+    student = auth_headers(data, student_id, datagen.STUDENT_ROLE_ID)
+    admin = auth_headers(data, data.admin_ids[0], datagen.ADMIN_ROLE_ID)
+    # The last lesson's quiz has at most two of the three allowed attempts used
+    last_quiz_id = data.quiz_by_lesson[data.lessons_by_course[course_id][-1]]
+    with SessionLocal() as db:
+        question_ids = db.execute(select(QuizQuestion.id).where(QuizQuestion.quiz_id == last_quiz_id)).scalars().all()
+    answers = [{"question_id": question_id, "selected": datagen.CHOICES[0]} for question_id in question_ids]
+
+    return {
+        ("GET", "/attendances/available"): dict(headers=student),
+        ("POST", "/attendances/check-in/{session_id}"): dict(
+            url=f"/attendances/check-in/{data.open_sessions[course_id]}", headers=student),
+        ("GET", "/quizzes/by-lesson/{lesson_id}"): dict(url=f"/quizzes/by-lesson/{lesson_id}", headers=student),
+        ("POST", "/quizzes/submit"): dict(json={"quiz_id": last_quiz_id, "answers": answers}, headers=student),
+        ("GET", "/courses/by-user/{user_id}"): dict(url=f"/courses/by-user/{student_id}", headers=student),
+        ("GET", "/admin/courses"): dict(headers=admin),
+        ("GET", "/users/{user_id}/dashboard-summary"): dict(url=f"/users/{student_id}/dashboard-summary", headers=student),
+    }
+
+
+def test_every_budgeted_route_stays_within_its_budget(client, data):
+    budgeted = {
+        (method, route.path)
+        for route in client.app.routes
+        if getattr(getattr(route, "endpoint", None), "query_budget", None) is not None
+        for method in route.methods
+    }
+    requests = _budgeted_requests(data)
+    assert budgeted == set(requests)
+
+    for (method, path), request in requests.items():
+        response = client.request(method, request.pop("url", path), **request)
+        assert response.status_code == 200, (method, path, response.text)
+
+
+# A keyset export runs one statement per page; those pages are not an N+1
+def test_paged_export_is_not_reported(client, data, monkeypatch):
+    with SessionLocal() as db:
+        quiz_id, results = db.execute(
+            select(StudentQuizResult.quiz_id, func.count())
+            .group_by(StudentQuizResult.quiz_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).one()
+    monkeypatch.setattr(quiz_crud, "_iter_quiz_result_rows", partial(quiz_crud._iter_quiz_result_rows, page_size=1))
+
+    response = client.get(f"/quizzes/{quiz_id}/results/export",
+                          headers=auth_headers(data, data.admin_ids[0], datagen.ADMIN_ROLE_ID))
+    assert response.status_code == 200
+    assert results >= 5
+    assert len(response.text.splitlines()) == results + 1
+
+# Neither is a bulk update upserting one chunk after another
+def test_chunked_bulk_update_is_not_reported(client, data, monkeypatch):
+    student_id, course_id, *_ = data.sample()
+    with SessionLocal() as db:
+        session_id = db.execute(
+            select(AttendanceSession.id).where(AttendanceSession.course_id == course_id).order_by(AttendanceSession.id)
+        ).scalars().first()
+    monkeypatch.setattr(attendance_crud, "BULK_UPDATE_CHUNK_SIZE", 1)
+
+    updates = [{"user_id": user_id, "present": True} for user_id in data.members(course_id)[:6]]
+    response = client.patch("/attendances/records", json={"session_id": session_id, "updates": updates},
+                            headers=auth_headers(data, data.course_creators[course_id], datagen.TEACHER_ROLE_ID))
+    assert response.status_code == 200
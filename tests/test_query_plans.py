@@ -0,0 +1,237 @@
+# Query-plan regression check for the hot paths in app/crud, against the suite's seeded database.
+#
+# Each scenario calls a CRUD function while capturing every statement it sends. Writes run in a transaction
+# that is rolled back afterwards, so they leave the shared dataset as it was. Each captured statement is
+# EXPLAINed with its real parameters, and the scenario fails when one of them reads a large table with a full
+# scan (PostgreSQL "Seq Scan", SQLite "SCAN <table>" without an index), except where it aggregates over the
+# whole table on purpose and says so in `full_scans`.
+import json
+import re
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, List, Tuple
+
+import pytest
+from sqlalchemy import Integer, event, func, select
+from sqlalchemy.orm import Session
+
+from app.crud import admin as admin_crud
+from app.crud import attendance as attendance_crud
+from app.crud import course as course_crud
+from app.crud import lesson as lesson_crud
+from app.crud import quiz as quiz_crud
+from app.crud import user as user_crud
+from app.database import engine
+from app.helpers.counters import pending_deltas
+from app.helpers.principals import Principal, RolePrincipal
+from app.helpers.quiz_cache import lesson_quiz_cache, quiz_cache
+from app.helpers.session_windows import active_sessions
+from app.models import Base
+from app.models.quiz_models import QuizQuestion
+from app.models.student_attendance import AttendanceSession
+from app.schemas.attendance import AttendanceBulkUpdate
+from app.schemas.quiz import QuizSubmitRequest
+from benchmarks import datagen
+
+# Tables that grow with users or activity; a full scan of any other table is not reported
+LARGE_TABLES = {
+    "users", "user_course", "lessons", "user_lesson_progress", "lesson_quizzes", "quiz_questions",
+    "student_quiz_results", "attendance_sessions", "student_attendances", "system_logs",
+}
+# Statements that only manage the transaction the scenario runs in
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+ABSENCE_CHUNK_SIZE = 5
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS (\w+))?(.*)$")
+# An automatic index is built from a full scan every time the statement runs, and a skip-scan (ANY(col))
+# seeks once per distinct value of a leading column the query does not constrain
+_SQLITE_INDIRECT_SCAN = re.compile(r"^SEARCH (\w+)(?: AS \w+)? USING (?:AUTOMATIC|.*\(ANY\()")
+_ORDER_BY = re.compile(r"\bORDER BY\s+(.+?)(?:\s+LIMIT\b|\s*$)", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable
+    # Tables this path is expected to read in full (whole-table aggregates)
+    full_scans: Tuple[str, ...] = ()
+
+
+def _principal(user_id: int, role_id: int, role_name: str) -> Principal:
+    return Principal(id=user_id, username=f"user{user_id}", role_id=role_id, role=RolePrincipal(id=role_id, name=role_name))
+
+def _cold_caches():
+    quiz_cache.clear()
+    lesson_quiz_cache.clear()
+
+def _available_sessions(s, db):
+    # Force the active session index to be rebuilt so its query is captured too
+    active_sessions._loaded_at = None
+    attendance_crud.get_available_sessions(db, s.student)
+
+def _quiz_for_lesson(s, db):
+    _cold_caches()
+    quiz_crud.get_quiz_by_lesson(s.lesson_id, s.student_id, db)
+
+def _completion_status(s, db):
+    _cold_caches()
+    quiz_crud.get_lesson_completion_status(s.student_id, s.lesson_id, db)
+
+def _submit_quiz(s, db):
+    _cold_caches()
+    answers = [{"question_id": question_id, "selected": datagen.CHOICES[0]} for question_id in s.question_ids]
+    quiz_crud.submit_quiz(QuizSubmitRequest(quiz_id=s.last_quiz_id, answers=answers), s.student_id, db)
+
+def _bulk_update_attendance(s, db):
+    updates = [{"user_id": user_id, "present": True} for user_id in s.members]
+    attendance_crud.bulk_update_attendance(AttendanceBulkUpdate(session_id=s.session_id, updates=updates), s.teacher, db)
+
+# The seeded dataset has a few dozen sessions, so a production-sized chunk would cover most of the table and
+# SQLite would rightly scan it; a small chunk keeps the plan the one a real chunk gets
+def _mark_absent(s, db):
+    attendance_crud.mark_absent_for_expired_sessions(db, chunk_size=ABSENCE_CHUNK_SIZE)
+
+SCENARIOS = [
+    Scenario("user.get_student_dashboard_summary", lambda s, db: user_crud.get_student_dashboard_summary(s.student_id, db)),
+    Scenario("user.get_users", lambda s, db: user_crud.get_users(db)),
+    Scenario("course.get_courses_by_user", lambda s, db: course_crud.get_courses_by_user(s.student_id, db)),
+    Scenario("course.get_users_by_course", lambda s, db: course_crud.get_users_by_course(s.course_id, db, s.teacher_id)),
+    Scenario("course.get_course_recommendations", lambda s, db: course_crud.get_course_recommendations(s.student_id, db)),
+    Scenario("lesson.get_lessons", lambda s, db: lesson_crud.get_lessons(s.course_id, db, s.teacher)),
+    Scenario("lesson.get_lessons_with_progress", lambda s, db: lesson_crud.get_lessons_with_progress(s.course_id, db, s.student)),
+    Scenario("quiz.get_quiz_by_lesson", _quiz_for_lesson),
+    Scenario("quiz.get_lesson_completion_status", _completion_status),
+    Scenario("quiz.get_quiz_results", lambda s, db: quiz_crud.get_quiz_results(s.quiz_id, db)),
+    Scenario("quiz.get_quiz_results(latest_only)", lambda s, db: quiz_crud.get_quiz_results(s.quiz_id, db, latest_only=True)),
+    Scenario("quiz.submit_quiz", _submit_quiz),
+    Scenario("attendance.get_sessions_by_teacher", lambda s, db: attendance_crud.get_sessions_by_teacher(db, s.teacher)),
+    Scenario("attendance.get_available_sessions", _available_sessions),
+    Scenario("attendance.get_attendance_by_course", lambda s, db: attendance_crud.get_attendance_by_course(s.course_id, db)),
+    Scenario("attendance.mark_attendance", lambda s, db: attendance_crud.mark_attendance(s.checking_in_id, s.open_session_id, db)),
+    Scenario("attendance.bulk_update_attendance", _bulk_update_attendance),
+    Scenario("attendance.mark_absent_for_expired_sessions", _mark_absent),
+    Scenario("admin.get_all_users", lambda s, db: admin_crud.get_all_users(db, role_id=datagen.STUDENT_ROLE_ID)),
+    Scenario("admin.get_course_details", lambda s, db: admin_crud.get_course_details(s.course_id, db)),
+    Scenario("admin.get_system_logs", lambda s, db: admin_crud.get_system_logs(db)),
+    Scenario("admin.get_all_courses_with_stats", lambda s, db: admin_crud.get_all_courses_with_stats(db),
+             full_scans=("user_course", "lessons", "user_lesson_progress")),
+]
+
+
+@pytest.fixture(scope="module")
+def sample(data: datagen.Dataset) -> SimpleNamespace:
+    student_id, course_id, lesson_id, quiz_id, teacher_id = data.sample()
+    # datagen leaves at most two of the three allowed attempts on the last lesson's quiz
+    last_quiz_id = data.quiz_by_lesson[data.lessons_by_course[course_id][-1]]
+    with engine.connect() as conn:
+        question_ids = conn.execute(select(QuizQuestion.id).where(QuizQuestion.quiz_id == last_quiz_id)).scalars().all()
+        past_session_id = conn.execute(
+            select(func.min(AttendanceSession.id))
+            .where(AttendanceSession.course_id == course_id, AttendanceSession.id != data.open_sessions[course_id])
+        ).scalar_one()
+    members = data.members(course_id)
+    return SimpleNamespace(
+        student_id=student_id, course_id=course_id, lesson_id=lesson_id, quiz_id=quiz_id, teacher_id=teacher_id,
+        student=_principal(student_id, datagen.STUDENT_ROLE_ID, "student"),
+        teacher=_principal(teacher_id, datagen.TEACHER_ROLE_ID, "teacher"),
+        last_quiz_id=last_quiz_id, question_ids=question_ids,
+        # A student other than the one the HTTP tests check in
+        checking_in_id=members[-1], open_session_id=data.open_sessions[course_id],
+        session_id=past_session_id,
+        members=members[:50],
+    )
+
+
+# Every statement the scenario sends, in a transaction rolled back afterwards: the session's commits only
+# release a savepoint inside it
+def capture(run: Callable) -> List[Tuple[str, object]]:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_TRANSACTION_CONTROL):
+            statements.append((statement, parameters))
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        # pysqlite begins a transaction only before a write, so a savepoint would otherwise be the outermost
+        # transaction and releasing it would commit
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN")
+        db = Session(bind=conn, join_transaction_mode="create_savepoint", autoflush=False)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            run(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+            db.close()
+            transaction.rollback()
+            # The rolled-back writes must not reach stat_counters either
+            pending_deltas.take()
+    return statements
+
+def _postgres_full_scans(plan) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_postgres_full_scans(child))
+    return found
+
+# Whether the statement's outermost ORDER BY starts with the table's rowid (its INTEGER primary key)
+def _orders_by_rowid(statement: str, table: str, alias: str) -> bool:
+    clauses = _ORDER_BY.findall(statement)
+    if not clauses or table not in Base.metadata.tables:
+        return False
+    qualifier, _, column = clauses[-1].split(",")[0].split()[0].rpartition(".")
+    primary_key = list(Base.metadata.tables[table].primary_key.columns)
+    rowid_columns = {"rowid"} | {c.name for c in primary_key if len(primary_key) == 1 and isinstance(c.type, Integer)}
+    return qualifier.strip('"') in (table, alias) and column.strip('"') in rowid_columns
+
+# (tables read with a full scan, plan as text)
+def explain(conn, statement: str, parameters) -> Tuple[List[str], str]:
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return _postgres_full_scans(plan[0]["Plan"]), json.dumps(plan[0]["Plan"], indent=1)
+    if dialect == "sqlite":
+        details = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        # SQLite shows a walk in rowid order as a bare SCAN. When a LIMIT query is ordered by that rowid and has no
+        # sort step, the walk is a keyset page that stops after `limit` rows, not a full read.
+        ordered_page = " LIMIT " in statement and not any("TEMP B-TREE" in detail for detail in details)
+        scans = []
+        for detail in details:
+            match = _SQLITE_SCAN.match(detail)
+            if match and "USING" not in match.group(3):
+                if ordered_page and _orders_by_rowid(statement, match.group(1), match.group(2)):
+                    ordered_page = False
+                    continue
+                scans.append(match.group(1))
+            match = _SQLITE_INDIRECT_SCAN.match(detail)
+            if match:
+                scans.append(match.group(1))
+        return scans, "\n".join(details)
+    pytest.skip(f"no EXPLAIN support for {dialect}")
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[scenario.name for scenario in SCENARIOS])
+def test_hot_path_does_not_full_scan_large_tables(scenario: Scenario, sample):
+    statements = capture(lambda db: scenario.run(sample, db))
+    assert statements
+
+    offending = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            scans, plan = explain(conn, statement, parameters)
+            large = sorted(set(scans) & LARGE_TABLES - set(scenario.full_scans))
+            if large:
+                offending.append(f"full scan of {', '.join(large)} in:\n{' '.join(statement.split())}\n{plan}")
+    assert not offending, "\n\n".join(offending)
+
+# Only a LIMIT walk in rowid order stops early; an unordered LIMIT query may read the whole table for few matches
+def test_sqlite_scan_is_exempt_only_as_a_rowid_ordered_page(data):
+    with engine.connect() as conn:
+        keyset_page, _ = explain(conn, "SELECT users.id FROM users WHERE users.id > ? ORDER BY users.id LIMIT ?", (0, 50))
+        filtered, _ = explain(conn, "SELECT users.id, users.password FROM users WHERE users.password LIKE ? LIMIT ?", ("%x%", 50))
+    assert keyset_page == []
+    assert filtered == ["users"]
@@ -0,0 +1,111 @@
+import re
+
+import pytest
+from sqlalchemy import event, select
+
+from app.crud import quiz as quiz_crud
+from app.database import SessionLocal, engine
+from app.helpers.quiz_cache import get_compiled_quiz, get_compiled_quiz_for_lesson, lesson_quiz_cache, quiz_cache
+from app.models.quiz_models import QuizQuestion, StudentQuizResult
+from app.schemas.quiz import QuizCreate, QuizUpdate
+from benchmarks import datagen
+from tests.conftest import auth_headers
+
+_QUIZ_TABLE_READ = re.compile(r"\b(?:FROM|JOIN)\s+\"?(?:lesson_quizzes|quiz_questions)\b", re.IGNORECASE)
+
+
+def _new_quiz(lesson_id: int) -> QuizCreate:
+    return QuizCreate(title="Cache check", lesson_id=lesson_id, questions=[
+        {"question": "2 + 2", "choices": ["3", "4"], "correct_answer": "4"},
+    ])
+
+# Both caches hold the lesson's quiz, as after a by-lesson request
+def _warm(db, lesson_id: int):
+    quiz_cache.clear()
+    lesson_quiz_cache.clear()
+    quiz = get_compiled_quiz_for_lesson(db, lesson_id)
+    assert quiz_cache.get(quiz.id) is quiz and lesson_quiz_cache.get(lesson_id) == quiz.id
+    return quiz
+
+def _assert_invalidated(quiz_id: int, lesson_id: int):
+    assert quiz_cache.get(quiz_id) is None
+    assert lesson_quiz_cache.get(lesson_id, "missing") == "missing"
+
+# A student with attempts left on the quiz of a lesson in their course
+def _unattempted_quiz(db, data: datagen.Dataset):
+    for student_id in reversed(data.student_ids):
+        for lesson_id in data.lessons_by_course[data.enrollments[student_id][0]]:
+            quiz_id = data.quiz_by_lesson.get(lesson_id)
+            attempted = db.execute(
+                select(StudentQuizResult.id).where(StudentQuizResult.user_id == student_id, StudentQuizResult.quiz_id == quiz_id)
+            ).first()
+            if quiz_id and not attempted:
+                return student_id, lesson_id, quiz_id
+
+
+# The compiled quiz is shared through the cache: a response must not hand out its answer key or choices
+def test_quiz_response_does_not_share_the_cached_quiz(data):
+    student_id, _, lesson_id, _, _ = data.sample()
+    quiz_cache.clear()
+    lesson_quiz_cache.clear()
+    with SessionLocal() as db:
+        response = quiz_crud.get_quiz_by_lesson(lesson_id, student_id, db)
+        response["correct_answers"].clear()
+        response["questions"][0]["choices"].append("tampered")
+
+        cached = get_compiled_quiz_for_lesson(db, lesson_id)
+    assert len(cached.correct_map) == len(cached.questions) > 0
+    assert "tampered" not in cached.questions[0].choices
+    with pytest.raises(TypeError):
+        cached.correct_map[cached.questions[0].id] = "tampered"
+
+def test_quiz_writes_invalidate_both_caches(client, data):
+    lesson_id = data.sample()[2]
+    teacher = auth_headers(data, data.course_creators[data.course_ids[0]], datagen.TEACHER_ROLE_ID)
+    with SessionLocal() as db:
+        quiz = _warm(db, lesson_id)
+        quiz_crud.update_quiz(quiz.id, QuizUpdate(title=None, questions=[]), db)
+        _assert_invalidated(quiz.id, lesson_id)
+
+        # A new quiz can change which quiz the lesson maps to
+        _warm(db, lesson_id)
+        created_id = quiz_crud.create_quiz_with_questions(_new_quiz(lesson_id), db)["quiz_id"]
+        _assert_invalidated(created_id, lesson_id)
+
+        _warm(db, lesson_id)
+        get_compiled_quiz(db, created_id)
+        quiz_crud.delete_quiz(created_id, db)
+        _assert_invalidated(created_id, lesson_id)
+
+        _warm(db, lesson_id)
+        response = client.post("/quizzes/import", content=_new_quiz(lesson_id).model_dump_json(), headers=teacher)
+        assert response.status_code == 201
+        (imported_id,) = response.json()["quiz_ids"]
+        _assert_invalidated(imported_id, lesson_id)
+        quiz_crud.delete_quiz(imported_id, db)
+
+# With both caches warm, showing and grading a quiz never reads the quiz tables
+def test_warm_quiz_requests_do_not_read_quiz_tables(client, data):
+    with SessionLocal() as db:
+        student_id, lesson_id, quiz_id = _unattempted_quiz(db, data)
+        question_ids = db.execute(select(QuizQuestion.id).where(QuizQuestion.quiz_id == quiz_id)).scalars().all()
+    headers = auth_headers(data, student_id, datagen.STUDENT_ROLE_ID)
+    answers = [{"question_id": question_id, "selected": datagen.CHOICES[0]} for question_id in question_ids]
+    quiz_cache.clear()
+    lesson_quiz_cache.clear()
+    assert client.get(f"/quizzes/by-lesson/{lesson_id}", headers=headers).status_code == 200
+
+    reads = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if _QUIZ_TABLE_READ.search(statement):
+            reads.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert client.get(f"/quizzes/by-lesson/{lesson_id}", headers=headers).status_code == 200
+        submitted = client.post("/quizzes/submit", json={"quiz_id": quiz_id, "answers": answers}, headers=headers)
+        assert submitted.status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert reads == []
@@ -0,0 +1,82 @@
+import json
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.quiz_models import LessonQuiz, QuizQuestion
+from benchmarks import datagen
+from tests.conftest import auth_headers
+
+QUIZ_LINE = json.dumps({"title": "Imported", "lesson_id": 1, "questions": [
+    {"question": "2 + 2", "choices": ["3", "4"], "correct_answer": "4"},
+]})
+
+
+def _quiz_line(**fields) -> str:
+    return json.dumps({**json.loads(QUIZ_LINE), **fields})
+
+def _quiz_count() -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(LessonQuiz)).scalar()
+
+def _teacher(data: datagen.Dataset) -> dict:
+    return auth_headers(data, data.course_creators[data.course_ids[0]], datagen.TEACHER_ROLE_ID)
+
+
+def test_students_cannot_import_quizzes(client, data):
+    response = client.post("/quizzes/import", content=QUIZ_LINE,
+                           headers=auth_headers(data, data.student_ids[0], datagen.STUDENT_ROLE_ID))
+    assert response.status_code == 403
+
+def test_oversized_body_is_rejected(client, data, monkeypatch):
+    monkeypatch.setattr(settings, "quiz_import_max_bytes", 100)
+    body = "\n".join([QUIZ_LINE] * 3)
+    assert client.post("/quizzes/import", content=body, headers=_teacher(data)).status_code == 413
+    # Without a Content-Length the body is still only read up to the limit
+    chunked = client.post("/quizzes/import", content=iter([body.encode()[:80], body.encode()[80:]]), headers=_teacher(data))
+    assert chunked.status_code == 413
+
+def test_too_many_quizzes_are_rejected_before_anything_is_written(client, data, monkeypatch):
+    monkeypatch.setattr(settings, "quiz_import_max_quizzes", 2)
+    response = client.post("/quizzes/import", content="\n".join([QUIZ_LINE] * 3), headers=_teacher(data))
+    assert response.status_code == 413
+    assert "At most 2 quizzes" in response.json()["detail"]
+
+def test_import_writes_every_quiz_and_its_questions(client, data):
+    lesson_id = data.lessons_by_course[data.course_ids[0]][0]
+    body = "\n".join([
+        _quiz_line(title="Imported A", lesson_id=lesson_id),
+        "",
+        _quiz_line(title="Imported B", lesson_id=lesson_id, questions=[
+            {"question": "1 + 1", "choices": ["1", "2"], "correct_answer": "2"},
+            {"question": "2 * 3", "choices": ["5", "6"], "correct_answer": "6"},
+        ]),
+    ])
+    response = client.post("/quizzes/import", content=body, headers=_teacher(data))
+    assert response.status_code == 201
+    quiz_ids = response.json()["quiz_ids"]
+
+    with SessionLocal() as db:
+        quizzes = db.scalars(select(LessonQuiz).where(LessonQuiz.id.in_(quiz_ids)).order_by(LessonQuiz.id)).all()
+        assert [(q.title, q.lesson_id) for q in quizzes] == [("Imported A", lesson_id), ("Imported B", lesson_id)]
+        questions = db.execute(
+            select(QuizQuestion.quiz_id, QuizQuestion.question, QuizQuestion.correct_answer)
+            .where(QuizQuestion.quiz_id.in_(quiz_ids)).order_by(QuizQuestion.id)
+        ).all()
+        assert [tuple(row) for row in questions] == [
+            (quiz_ids[0], "2 + 2", "4"), (quiz_ids[1], "1 + 1", "2"), (quiz_ids[1], "2 * 3", "6"),
+        ]
+
+# A quiz without questions or a question without choices could never be graded
+def test_one_bad_line_rejects_the_whole_batch(client, data):
+    before = _quiz_count()
+    body = "\n".join([
+        QUIZ_LINE,
+        _quiz_line(questions=[]),
+        _quiz_line(questions=[{"question": "Empty", "choices": [], "correct_answer": "4"}]),
+    ])
+    response = client.post("/quizzes/import", content=body, headers=_teacher(data))
+    assert response.status_code == 400
+    assert response.json()["detail"] == ["Line 2: Quiz has no questions", "Line 3: Question has no choices: Empty"]
+    assert _quiz_count() == before
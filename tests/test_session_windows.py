@@ -0,0 +1,27 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database import run_db
+from app.helpers.session_windows import active_sessions
+from tests.conftest import DATABASE_PATH
+
+
+# In async mode the rebuild runs on the event loop thread; a caller waiting for it there would block the loop
+def test_concurrent_polls_of_a_stale_index_all_return(data):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{DATABASE_PATH}")
+
+    async def poll():
+        async with AsyncSession(async_engine) as db:
+            return await run_db(db, lambda db: active_sessions.active_for_courses(db, data.course_ids, datetime.now()))
+
+    async def polls():
+        active_sessions._loaded_at = None
+        try:
+            return await asyncio.wait_for(asyncio.gather(*(poll() for _ in range(5))), timeout=10)
+        finally:
+            await async_engine.dispose()
+
+    results = asyncio.run(polls())
+    assert [sorted(window.id for window in windows) for windows in results] == [sorted(data.open_sessions.values())] * 5
@@ -0,0 +1,89 @@
+import importlib.util
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.helpers.user_search import UserNgramIndex, _search_postgres
+from app.models.user import User
+from tests.test_query_plans import explain
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+
+
+def _user(db, user_id: int) -> User:
+    return db.get(User, user_id)
+
+def _migration(name: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(MIGRATIONS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Prefix matches come first, then the other substring matches; a role filter applies to both
+def test_prefix_matches_rank_before_substring_matches(data):
+    index = UserNgramIndex()
+    with SessionLocal() as db:
+        student = _user(db, data.student_ids[0])
+        assert index.search(db, student.username, None, 5)[0] == student.id
+
+        # Drops the role prefix, so no username or email starts with it
+        term = student.username.split("_", 1)[1]
+        ids = index.search(db, term, student.role_id, 20)
+        assert student.id in ids
+        assert all(_user(db, user_id).role_id == student.role_id for user_id in ids)
+
+# The search never rebuilds an index that is already loaded; committed users are applied through add()
+def test_added_user_is_found_without_a_rebuild(data):
+    index = UserNgramIndex()
+    with SessionLocal() as db:
+        index.search(db, "x", None, 1)
+        loaded_at = index._loaded_at
+        user = _user(db, data.student_ids[1])
+        original = user.username
+        user.username = "qwzuniquestudent"
+        index.add(user)
+        try:
+            assert index.search(db, "wzunique", None, 5) == [user.id]
+            assert index.search(db, original, None, 50).count(user.id) == 0
+        finally:
+            db.rollback()
+        assert index._loaded_at == loaded_at
+
+# The suite's schema comes from create_all, so V18's indexes are applied in a transaction that is rolled back.
+# Sequential scans are switched off so the small dataset cannot make reading the whole table the cheaper plan.
+def test_postgres_substring_search_walks_the_trigram_indexes(data):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("the pg_trgm indexes exist only on PostgreSQL")
+    # Drops the role prefix, so nothing matches as a prefix and the search goes on to the trigram step
+    term = data.usernames[data.student_ids[0]].split("_", 1)[1]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "<->" in statement:
+            statements.append((statement, parameters))
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            with Operations.context(MigrationContext.configure(conn)):
+                _migration("V18__add_user_search_indexes").upgrade()
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            db = Session(bind=conn, join_transaction_mode="create_savepoint")
+            event.listen(conn, "before_cursor_execute", record)
+            try:
+                assert _search_postgres(db, term, None, 20)
+            finally:
+                event.remove(conn, "before_cursor_execute", record)
+            plans = [explain(conn, statement, parameters)[1] for statement, parameters in statements]
+        finally:
+            transaction.rollback()
+
+    assert len(plans) == 2
+    assert "ix_users_username_trgm" in plans[0]
+    assert "ix_users_email_trgm" in plans[1]